@@ -0,0 +1 @@
+"""Benchmarks for django-related-models; see :mod:`benchmarks.run`."""
@@ -0,0 +1,237 @@
+"""
+Benchmarks for django-related-models on a synthetic schema.
+
+Run from the root of the repository with::
+
+    PYTHONPATH=src python -m benchmarks.run --models 300 --rows 200 --output results.json
+
+and compare two result files, e.g. from two releases, with::
+
+    python -m benchmarks.run --compare before.json after.json
+
+The results are written as JSON with the parameters of the run, the
+versions of Python and Django, and one entry per measurement.  Timings are
+in seconds and memory in bytes.
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+
+
+def configure(database):
+    settings.configure(
+        DEBUG=False,
+        SECRET_KEY='benchmarks',
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'benchmarks',
+        ],
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': database,
+            }
+        },
+        DEFAULT_AUTO_FIELD='django.db.models.AutoField',
+    )
+    django.setup()
+
+
+def timed(func, repeat=1):
+    """
+    Calls *func* *repeat* times and returns the durations of the calls.
+    """
+    durations = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def summarize(durations):
+    durations = sorted(durations)
+    return {
+        'min': durations[0],
+        'median': statistics.median(durations),
+        'p95': durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+        'max': durations[-1],
+        'count': len(durations),
+    }
+
+
+def count_queries(func):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as context:
+        func()
+    return len(context.captured_queries)
+
+
+def peak_memory(func):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def consume(iterable):
+    for item in iterable:
+        pass
+
+
+def run(args):
+    configure(args.database)
+
+    from django.core.management import call_command
+
+    import django_related_models
+    from django_related_models import related_models
+    from django_related_models.related_models import GenericForeignKeyCache
+    from django_related_models.related_models import RelatedModels
+
+    from .schema import create_tables
+    from .schema import generate_schema
+    from .schema import populate_schema
+
+    start = time.perf_counter()
+    schema = generate_schema(
+        args.models,
+        fks_per_model=args.fks_per_model,
+        gfks_per_model=args.gfks_per_model,
+        seed=args.seed,
+    )
+    call_command('migrate', verbosity=0)
+    create_tables(schema)
+    accounts = populate_schema(schema, accounts=args.accounts, rows=args.rows, seed=args.seed)
+    setup_time = time.perf_counter() - start
+
+    account_model = schema[0]
+    results = {}
+
+    def cold_discovery():
+        related_models.clear_relation_graph_cache()
+        RelatedModels(generic_foreign_key_cache=GenericForeignKeyCache()).get_referring_models(account_model)
+
+    results['discovery_cold'] = summarize(timed(cold_discovery, repeat=args.repeat))
+    results['discovery_warm'] = summarize(timed(
+        lambda: RelatedModels().get_referring_models(account_model),
+        repeat=args.repeat * 10,
+    ))
+
+    gfk_fields = [
+        field for model in schema[1:] for field in model._meta.private_fields
+    ]
+
+    def generic_foreign_key_scan(use_exists):
+        rm = RelatedModels(generic_foreign_key_cache=GenericForeignKeyCache(use_exists=use_exists))
+        for field in gfk_fields:
+            rm.has_generic_foreign_key_to_model(field, account_model)
+
+    results['generic_foreign_key_distinct'] = summarize(timed(
+        lambda: generic_foreign_key_scan(False), repeat=args.repeat
+    ))
+    results['generic_foreign_key_exists'] = summarize(timed(
+        lambda: generic_foreign_key_scan(True), repeat=args.repeat
+    ))
+
+    sample = accounts[:args.sample]
+    lookups = [
+        ('get_related_objects', related_models.get_related_objects),
+        ('get_related_pks', related_models.get_related_pks),
+        ('get_related_counts', related_models.get_related_counts),
+        ('has_related_objects', related_models.has_related_objects),
+        ('iter_related_objects', lambda account: consume(related_models.iter_related_objects(account))),
+    ]
+    for name, lookup in lookups:
+        durations = []
+        for account in sample:
+            durations.extend(timed(lambda: lookup(account)))
+        results[name] = summarize(durations)
+        results[name]['queries'] = count_queries(lambda: lookup(sample[0]))
+
+    results['get_related_objects_bulk'] = summarize(timed(
+        lambda: related_models.get_related_objects_bulk(sample), repeat=args.repeat
+    ))
+    results['get_related_objects_bulk']['queries'] = count_queries(
+        lambda: related_models.get_related_objects_bulk(sample)
+    )
+
+    results['get_related_objects']['peak_memory'] = peak_memory(
+        lambda: related_models.get_related_objects(sample[0])
+    )
+    results['iter_related_objects']['peak_memory'] = peak_memory(
+        lambda: consume(related_models.iter_related_objects(sample[0]))
+    )
+
+    return {
+        'parameters': vars(args),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'django_related_models': django_related_models.__version__,
+            'setup_time': setup_time,
+            'referring_fields': sum(
+                len(fields) for fields in RelatedModels().get_referring_models(account_model).values()
+            ),
+        },
+        'results': results,
+    }
+
+
+def compare(before_path, after_path):
+    """
+    Prints the relative change of the median time of every measurement
+    between two result files.
+    """
+    with open(before_path) as before_file, open(after_path) as after_file:
+        before = json.load(before_file)['results']
+        after = json.load(after_file)['results']
+
+    for name in sorted(set(before) & set(after)):
+        old, new = before[name]['median'], after[name]['median']
+        change = (new - old) / old * 100 if old else 0.0
+        print('{:<32} {:>12.6f} {:>12.6f} {:>+8.1f}%'.format(name, old, new, change))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--models', type=int, default=200, help='number of generated models')
+    parser.add_argument('--fks-per-model', type=int, default=3, help='foreign keys on every model')
+    parser.add_argument('--gfks-per-model', type=int, default=1, help='generic foreign keys on every model')
+    parser.add_argument('--accounts', type=int, default=20, help='number of root instances')
+    parser.add_argument('--rows', type=int, default=100, help='rows created for every model')
+    parser.add_argument('--sample', type=int, default=10, help='number of accounts looked up')
+    parser.add_argument('--repeat', type=int, default=5, help='repetitions of every measurement')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--database', default=':memory:', help='SQLite database file')
+    parser.add_argument('--output', help='file to write the results to, defaults to stdout')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two result files')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    output = json.dumps(run(args), indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        sys.stdout.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Generates large synthetic schemas for the benchmarks.
+
+Every schema has a root ``Account`` model, which is the model whose related
+objects are looked up, followed by *model_count* models.  Each of them has
+*fks_per_model* foreign keys, the first to ``Account`` and the others to
+randomly chosen earlier models, as well as *gfks_per_model* generic foreign
+keys.
+"""
+import random
+
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db import models
+
+APP_LABEL = 'benchmarks'
+
+
+def _create_model(name, attrs):
+    attrs = dict(attrs, __module__='benchmarks.models')
+    attrs['Meta'] = type('Meta', (object,), {'app_label': APP_LABEL})
+    return type(str(name), (models.Model,), attrs)
+
+
+def generate_schema(model_count, fks_per_model=3, gfks_per_model=1, seed=0):
+    """
+    Creates and registers the models of a synthetic schema and returns
+    them, starting with the ``Account`` model.
+
+    :rtype: List[Model]
+    """
+    rng = random.Random(seed)
+    account = _create_model('Account', {'name': models.CharField(max_length=50)})
+    schema = [account]
+
+    for i in range(model_count):
+        attrs = {'name': models.CharField(max_length=50)}
+        for j in range(fks_per_model):
+            target = account if j == 0 else rng.choice(schema)
+            attrs['fk_{}'.format(j)] = models.ForeignKey(
+                target,
+                related_name='+',
+                on_delete=models.CASCADE,
+            )
+        for j in range(gfks_per_model):
+            ct_field = 'content_type_{}'.format(j)
+            fk_field = 'object_id_{}'.format(j)
+            attrs[ct_field] = models.ForeignKey(
+                ContentType,
+                related_name='+',
+                on_delete=models.CASCADE,
+            )
+            attrs[fk_field] = models.PositiveIntegerField(db_index=True)
+            attrs['content_object_{}'.format(j)] = GenericForeignKey(ct_field, fk_field)
+        schema.append(_create_model('Model{}'.format(i), attrs))
+    return schema
+
+
+def create_tables(schema):
+    """
+    Creates the database tables for the models of *schema*.
+    """
+    with connection.schema_editor() as schema_editor:
+        for model in schema:
+            schema_editor.create_model(model)
+
+
+def populate_schema(schema, accounts=10, rows=100, seed=0):
+    """
+    Creates *accounts* instances of ``Account`` and *rows* instances of
+    every other model of *schema*, with their foreign keys pointing to
+    random instances of their targets.  Half of the generic foreign keys
+    point to an account and the other half to an instance of the model
+    itself.
+
+    :rtype: List[Account]
+    """
+    rng = random.Random(seed)
+    account = schema[0]
+    account.objects.bulk_create(
+        account(name='account-{}'.format(i)) for i in range(accounts)
+    )
+
+    pks_by_model = {account: list(account.objects.values_list('pk', flat=True))}
+    account_content_type = ContentType.objects.get_for_model(account)
+    for model in schema[1:]:
+        content_type = ContentType.objects.get_for_model(model)
+        fks = [
+            field for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model is not ContentType
+        ]
+        gfks = model._meta.private_fields
+        objects = []
+        for i in range(rows):
+            obj = model(name='row-{}'.format(i))
+            for field in fks:
+                setattr(obj, field.attname, rng.choice(pks_by_model[field.related_model]))
+            for field in gfks:
+                if i % 2:
+                    setattr(obj, field.ct_field + '_id', account_content_type.pk)
+                    setattr(obj, field.fk_field, rng.choice(pks_by_model[account]))
+                else:
+                    setattr(obj, field.ct_field + '_id', content_type.pk)
+                    setattr(obj, field.fk_field, rng.randint(1, rows))
+            objects.append(obj)
+        model.objects.bulk_create(objects, batch_size=500)
+        pks_by_model[model] = list(model.objects.values_list('pk', flat=True))
+    return list(account.objects.all())
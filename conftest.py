@@ -0,0 +1,14 @@
+import sys
+
+import django
+
+collect_ignore = []
+
+if sys.version_info < (3, 6) or django.VERSION < (3, 0):
+    # The asynchronous lookups use native coroutines, which cannot even be
+    # parsed on Python 2, and asgiref, which comes with Django 3.0.
+    collect_ignore.append('src/django_related_models/async_related_models.py')
+
+if sys.version_info < (3, 6) or django.VERSION < (3, 1):
+    # Their tests are coroutines too, which Django only runs since 3.1.
+    collect_ignore.append('tests/test_async_related_models.py')
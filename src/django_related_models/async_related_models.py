@@ -0,0 +1,151 @@
+"""
+Native :mod:`asyncio` versions of the lookups in
+:mod:`django_related_models.related_models`.
+
+The per-field queries are independent of each other, so they are run
+concurrently, at most *concurrency* at a time, each on a worker thread
+with its own database connection, which is closed once the query is done.
+The asynchronous queryset methods of Django would instead run all of them
+one after another, on the single thread shared by the synchronous code.
+
+Worker threads cannot see the rows written by a transaction which has
+not been committed yet, so inside of :func:`~django.db.transaction.atomic`
+the queries are run one after another on the connection of the caller.
+
+Looking up the referring models and the content types may hit the
+database, so :func:`~django_related_models.related_models.get_related_querysets`
+is run synchronously before the querysets are evaluated.  These functions
+require Python 3 and asgiref, which is installed with Django 3.0 and later.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+
+from . import instrumentation
+from .related_models import get_related_querysets
+
+#: The default number of queries which are run concurrently.
+DEFAULT_CONCURRENCY = 10
+
+
+def _get_querysets(instance, **kwargs):
+    """
+    Returns :func:`~django_related_models.related_models.get_related_querysets`
+    for *instance*, and whether they can be evaluated on worker threads,
+    which is not the case if any of their databases is in a transaction.
+    """
+    querysets = get_related_querysets(instance, **kwargs)
+    concurrent = not any(connections[queryset.db].in_atomic_block for field, queryset in querysets)
+    return querysets, concurrent
+
+
+def _evaluate_in_thread(func, queryset):
+    """
+    Returns ``func(queryset)``, and closes the connection of the worker
+    thread it ran on.
+    """
+    try:
+        return func(queryset)
+    finally:
+        connections[queryset.db].close()
+
+
+def _limit(func, querysets, concurrency, concurrent, rows=len):
+    """
+    Returns a coroutine awaiting ``func(queryset)`` for each of the
+    ``(field, queryset)`` in *querysets*, such that at most *concurrency*
+    of them run at the same time, on worker threads if *concurrent* is
+    set, and one after another on the thread of the synchronous code
+    otherwise.  The queries are reported to the observers in
+    :mod:`~django_related_models.instrumentation`, if there are any, with
+    *rows* returning the number of rows from a result.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    if concurrent:
+        evaluate = sync_to_async(_evaluate_in_thread, thread_sensitive=False)
+    else:
+        evaluate = sync_to_async(lambda func, queryset: func(queryset))
+
+    async def run(field, queryset):
+        async with semaphore:
+            if not instrumentation.observers:
+                return await evaluate(func, queryset)
+
+            start = instrumentation.timer()
+            result = await evaluate(func, queryset)
+            instrumentation.notify_query_executed(
+                field, queryset, instrumentation.timer() - start, rows(result)
+            )
+            return result
+
+    return [run(field, queryset) for field, queryset in querysets]
+
+
+async def aget_related_objects(instance, concurrency=DEFAULT_CONCURRENCY, **kwargs):
+    """
+    Asynchronous version of
+    :func:`~django_related_models.related_models.get_related_objects`.
+
+    :rtype: Dict[Field, List[Object]]
+    """
+    querysets, concurrent = await sync_to_async(_get_querysets)(instance, **kwargs)
+    results = await asyncio.gather(*_limit(list, querysets, concurrency, concurrent))
+    return {
+        field: related_objects
+        for (field, queryset), related_objects in zip(querysets, results)
+        if related_objects
+    }
+
+
+async def aget_related_counts(instance, concurrency=DEFAULT_CONCURRENCY, **kwargs):
+    """
+    Asynchronous version of
+    :func:`~django_related_models.related_models.get_related_counts`.
+
+    :rtype: Dict[Field, int]
+    """
+    querysets, concurrent = await sync_to_async(_get_querysets)(instance, **kwargs)
+    counts = await asyncio.gather(*_limit(
+        lambda queryset: queryset.count(),
+        querysets,
+        concurrency,
+        concurrent,
+        rows=int
+    ))
+    return {
+        field: count
+        for (field, queryset), count in zip(querysets, counts)
+        if count
+    }
+
+
+async def ahas_related_objects(instance, concurrency=DEFAULT_CONCURRENCY, **kwargs):
+    """
+    Asynchronous version of
+    :func:`~django_related_models.related_models.has_related_objects`.
+
+    The ``EXISTS`` queries are run concurrently and the ones which have
+    not started yet are cancelled as soon as one of them finds a row.
+
+    :rtype: bool
+    """
+    querysets, concurrent = await sync_to_async(_get_querysets)(instance, **kwargs)
+    tasks = [
+        asyncio.ensure_future(coroutine)
+        for coroutine in _limit(
+            lambda queryset: queryset.exists(),
+            querysets,
+            concurrency,
+            concurrent,
+            rows=int
+        )
+    ]
+    try:
+        for future in asyncio.as_completed(tasks):
+            if await future:
+                return True
+        return False
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,207 @@
+"""
+A compact representation of large sets of related rows, which only keeps
+their primary keys, packed in :mod:`array` buffers when they are integers.
+
+A million integer primary keys take 8MB this way, instead of the hundreds
+of megabytes taken by as many model instances.  The instances can still be
+loaded, a batch at a time, with :meth:`CompactRelatedObjects.iter_objects`.
+"""
+from array import array
+from collections import OrderedDict
+from itertools import islice
+
+#: The :mod:`array` type code used for integer primary keys.
+TYPECODE = 'q'
+try:
+    array(TYPECODE)
+except ValueError:  # Python 2, where longs are 64 bit on 64 bit Unix
+    TYPECODE = 'l'
+
+
+def pack_pks(pks, integer=True):
+    """
+    Returns the sorted, distinct primary keys *pks*, as an
+    :class:`~array.array` if they are *integer* and as a tuple otherwise.
+    *pks* can be any iterable, and if it is already sorted, no more than
+    the packed primary keys are held in memory.
+
+    :rtype: Union[array, tuple]
+    """
+    packed = array(TYPECODE) if integer else []
+    last = None
+    is_sorted = True
+    for pk in pks:
+        if last is not None and pk <= last:
+            is_sorted = False
+        packed.append(pk)
+        last = pk
+
+    if not is_sorted:
+        values = sorted(set(packed))
+        packed = array(TYPECODE, values) if integer else values
+    return packed if integer else tuple(packed)
+
+
+def _merge(first, second, keep_first, keep_both, keep_second):
+    """
+    Yields the primary keys of the sorted *first* and *second* which are
+    only in *first*, in both or only in *second*, depending on which of
+    *keep_first*, *keep_both* and *keep_second* are set.
+    """
+    i = j = 0
+    while i < len(first) and j < len(second):
+        if first[i] < second[j]:
+            if keep_first:
+                yield first[i]
+            i += 1
+        elif second[j] < first[i]:
+            if keep_second:
+                yield second[j]
+            j += 1
+        else:
+            if keep_both:
+                yield first[i]
+            i += 1
+            j += 1
+    if keep_first:
+        for pk in islice(first, i, None):
+            yield pk
+    if keep_second:
+        for pk in islice(second, j, None):
+            yield pk
+
+
+class CompactRelatedObjects(object):
+    """
+    The primary keys of related rows, grouped by key (the referring field,
+    or the model after :meth:`by_model`), along with the model of the rows
+    of each key.
+
+    The number of rows is returned by :func:`len` without loading any of
+    them.  Results can be combined with the ``&``, ``|`` and ``-`` set
+    operators, which are applied key by key; keys without any rows left
+    are dropped.
+    """
+
+    def __init__(self):
+        self._pks = OrderedDict()
+        self._models = {}
+
+    def add(self, key, model, pks, integer=True):
+        """
+        Adds the primary keys *pks* of rows of *model* under *key*.  See
+        :func:`pack_pks`.
+        """
+        packed = pack_pks(pks, integer=integer)
+        if key in self._pks:
+            packed = self._combine(self._pks[key], packed, True, True, True)
+        if packed:
+            self._pks[key] = packed
+            self._models[key] = model
+
+    def get_model(self, key):
+        """
+        Returns the model of the rows stored under *key*.
+
+        :rtype: Model
+        """
+        return self._models[key]
+
+    def keys(self):
+        return list(self._pks)
+
+    def items(self):
+        return list(self._pks.items())
+
+    def __iter__(self):
+        return iter(self._pks)
+
+    def __contains__(self, key):
+        return key in self._pks
+
+    def __getitem__(self, key):
+        return self._pks[key]
+
+    def __len__(self):
+        return sum(len(pks) for pks in self._pks.values())
+
+    def __bool__(self):
+        return bool(self._pks)
+
+    __nonzero__ = __bool__
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactRelatedObjects):
+            return NotImplemented
+        return dict(self._pks) == dict(other._pks)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __repr__(self):
+        return '<{}: {} rows in {} keys>'.format(type(self).__name__, len(self), len(self._pks))
+
+    def _combine(self, first, second, keep_first, keep_both, keep_second):
+        merged = _merge(first, second, keep_first, keep_both, keep_second)
+        if isinstance(first, array) or isinstance(second, array):
+            return array(TYPECODE, merged)
+        return tuple(merged)
+
+    def _apply(self, other, keep_first, keep_both, keep_second):
+        if not isinstance(other, CompactRelatedObjects):
+            return NotImplemented
+
+        result = CompactRelatedObjects()
+        keys = list(self._pks)
+        keys.extend(key for key in other._pks if key not in self._pks)
+        for key in keys:
+            first = self._pks.get(key, ())
+            second = other._pks.get(key, ())
+            packed = self._combine(first, second, keep_first, keep_both, keep_second)
+            if packed:
+                result._pks[key] = packed
+                result._models[key] = self._models.get(key) or other._models[key]
+        return result
+
+    def __and__(self, other):
+        return self._apply(other, False, True, False)
+
+    def __or__(self, other):
+        return self._apply(other, True, True, True)
+
+    def __sub__(self, other):
+        return self._apply(other, True, False, False)
+
+    def by_model(self):
+        """
+        Returns the same rows grouped by their (concrete) model instead,
+        so that, for instance, the rows referring to two different
+        instances through different fields can be intersected.
+
+        :rtype: :class:`CompactRelatedObjects`
+        """
+        result = CompactRelatedObjects()
+        for key, pks in self._pks.items():
+            model = self._models[key]._meta.concrete_model
+            result.add(model, model, pks, integer=isinstance(pks, array))
+        return result
+
+    def iter_objects(self, chunk_size=2000, chunked=False):
+        """
+        Lazily yields ``(key, obj)`` for all the rows, loading them from
+        the database *chunk_size* at a time, in primary key order.  If
+        *chunked* is set, ``(key, objs)`` is yielded instead, where *objs*
+        is a list of at most *chunk_size* instances.
+
+        :rtype: Iterator[Tuple[Any, Object]]
+        """
+        for key, pks in self._pks.items():
+            manager = self._models[key]._default_manager
+            for start in range(0, len(pks), chunk_size):
+                objs = list(manager.filter(pk__in=list(pks[start:start + chunk_size])).order_by('pk'))
+                if chunked:
+                    yield key, objs
+                else:
+                    for obj in objs:
+                        yield key, obj
@@ -0,0 +1,199 @@
+"""
+Reading and writing the relations of the installed models to a file, so
+that new processes can build their
+:class:`~django_related_models.related_models.RelationGraph` without
+introspecting every model.
+
+The file is written by the ``compile_relation_graph`` management command,
+typically at deploy time, and is read lazily the first time a graph is
+built if the ``RELATED_MODELS_GRAPH_FILE`` setting points to it.  It
+records a fingerprint of the schema which is checked before the file is
+used, so a stale file is ignored rather than trusted.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from django.apps import apps
+from django.conf import settings
+
+try:
+    from django.core.exceptions import FieldDoesNotExist
+except ImportError:  # Django < 3.1
+    from django.db.models.fields import FieldDoesNotExist
+
+#: The version of the file format, which is part of the fingerprint.
+FORMAT_VERSION = 1
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_graph_file():
+    """
+    Returns the path of the compiled relation graph from the
+    ``RELATED_MODELS_GRAPH_FILE`` setting, or ``None``.
+
+    :rtype: str
+    """
+    return getattr(settings, 'RELATED_MODELS_GRAPH_FILE', None)
+
+
+def get_private_fields(opts):
+    """
+    Returns the private fields, such as generic foreign keys, of the model
+    options *opts*.
+
+    :rtype: List[Field]
+    """
+    if hasattr(opts, 'private_fields'):
+        return opts.private_fields
+    return opts.virtual_fields
+
+
+def get_model_field(model, name):
+    """
+    Returns the field *name* of *model*, including generic foreign keys on
+    the versions of Django where they are not returned by
+    :meth:`~django.db.models.Options.get_field`.
+
+    :rtype: Field
+    """
+    opts = model._meta
+    for field in get_private_fields(opts):
+        if field.name == name:
+            return field
+    return opts.get_field(name)
+
+
+def get_schema_fingerprint():
+    """
+    Returns a fingerprint of the installed models and of their local
+    fields.  Unlike :meth:`~django.db.models.Options.get_fields`, this does
+    not build the reverse relations of the models, so it is cheap to
+    compute.
+
+    :rtype: str
+    """
+    fingerprint = hashlib.sha1(str(FORMAT_VERSION).encode('utf-8'))
+    for model in apps.get_models(include_auto_created=True):
+        opts = model._meta
+        parts = [opts.label, opts.db_table]
+        for field in list(opts.local_fields) + list(get_private_fields(opts)):
+            related_model = getattr(field, 'related_model', None)
+            parts.extend([
+                field.name,
+                type(field).__name__,
+                related_model._meta.label if related_model is not None else '',
+            ])
+        fingerprint.update('\0'.join(parts).encode('utf-8'))
+        fingerprint.update(b'\1')
+    return fingerprint.hexdigest()
+
+
+def dump_model_relations(relations):
+    """
+    Returns the JSON-serializable form of *relations*, as returned by
+    :meth:`~django_related_models.related_models.RelatedModels.scan_model_relations`.
+
+    Every model is stored as its label, followed by the
+    ``[name, target model, target field]`` of each of its foreign keys and
+    the names of its generic foreign keys.
+
+    :rtype: dict
+    """
+    return {
+        'version': FORMAT_VERSION,
+        'fingerprint': get_schema_fingerprint(),
+        'models': [
+            [
+                model._meta.label,
+                [
+                    [field.name, field.related_model._meta.label, field.target_field.name]
+                    for field in fields
+                ],
+                [field.name for field in generic_fields],
+            ]
+            for model, fields, generic_fields in relations
+        ],
+    }
+
+
+def write_model_relations(relations, path):
+    """
+    Writes *relations* to the file at *path*.  The file is replaced
+    atomically so that processes starting at the same time never read a
+    partial file.
+    """
+    data = json.dumps(dump_model_relations(relations), separators=(',', ':'))
+    temporary_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temporary_path, 'w') as graph_file:
+        graph_file.write(data)
+    getattr(os, 'replace', os.rename)(temporary_path, path)
+
+
+def _read(path):
+    """
+    Returns the parsed contents of the file at *path*, which are cached
+    until the file is modified, or ``None`` if it cannot be read.
+    """
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    try:
+        with open(path) as graph_file:
+            data = json.load(graph_file)
+    except (IOError, OSError, ValueError):
+        data = None
+
+    with _cache_lock:
+        _cache[path] = (mtime, data)
+    return data
+
+
+def load_model_relations(path=None):
+    """
+    Returns the relations stored in the file at *path*, which defaults to
+    :func:`get_graph_file`, in the form returned by
+    :meth:`~django_related_models.related_models.RelatedModels.scan_model_relations`.
+
+    ``None`` is returned if there is no file, or if it does not match the
+    current schema.
+
+    :rtype: List[Tuple[Model, List[Field], List[GenericForeignKey]]]
+    """
+    path = path or get_graph_file()
+    if not path:
+        return None
+
+    data = _read(path)
+    if (
+        not isinstance(data, dict) or
+        data.get('version') != FORMAT_VERSION or
+        data.get('fingerprint') != get_schema_fingerprint()
+    ):
+        return None
+
+    try:
+        relations = []
+        for label, field_specs, generic_field_names in data['models']:
+            model = apps.get_model(label)
+            fields = []
+            for name, target_label, target_field_name in field_specs:
+                field = get_model_field(model, name)
+                if field.related_model._meta.label != target_label:
+                    return None
+                fields.append(field)
+            generic_fields = [get_model_field(model, name) for name in generic_field_names]
+            relations.append((model, fields, generic_fields))
+    except (FieldDoesNotExist, LookupError, ValueError, TypeError):
+        return None
+    return relations
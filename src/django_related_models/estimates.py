@@ -0,0 +1,99 @@
+"""
+Approximate counts of related rows, for tables too large for an exact
+``COUNT(*)``.
+
+The rows are first counted up to a limit, which is cheap whatever the size
+of the table.  Past the limit, the row estimate of the query planner is used
+on the backends which expose one through ``EXPLAIN``, and every count is
+labelled with how far it can be trusted.
+"""
+import json
+from collections import namedtuple
+
+from django.db import connections
+
+#: The count is the exact number of rows.
+EXACT = 'exact'
+
+#: The count is the estimate of the query planner.
+ESTIMATED = 'estimated'
+
+#: There are at least as many rows as the count.
+AT_LEAST = 'at_least'
+
+
+class RelatedCount(namedtuple('RelatedCount', ['value', 'kind'])):
+    """
+    A number of related rows, whose *kind* is one of :data:`EXACT`,
+    :data:`ESTIMATED` or :data:`AT_LEAST`.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        if self.kind == ESTIMATED:
+            return '~{}'.format(self.value)
+        if self.kind == AT_LEAST:
+            return '>={}'.format(self.value)
+        return str(self.value)
+
+
+def _explain_postgresql(cursor, sql, params):
+    cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+    plan = cursor.fetchone()[0]
+    # The JSON is decoded by psycopg2, but not by every driver.
+    if not isinstance(plan, list):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
+
+
+def _explain_mysql(cursor, sql, params):
+    cursor.execute('EXPLAIN ' + sql, params)
+    columns = [column[0] for column in cursor.description]
+    row = dict(zip(columns, cursor.fetchone()))
+    if row.get('rows') is None:
+        return None
+    return row['rows'] * float(row.get('filtered') or 100) / 100
+
+
+_EXPLAIN_FUNCTIONS = {
+    'postgresql': _explain_postgresql,
+    'mysql': _explain_mysql,
+}
+
+
+def estimate_rows(queryset):
+    """
+    Returns the number of rows of *queryset* estimated by the query
+    planner, from ``EXPLAIN`` on PostgreSQL and MySQL, or ``None`` on the
+    backends without row estimates, such as SQLite.
+
+    :rtype: Optional[int]
+    """
+    connection = connections[queryset.db]
+    explain = _EXPLAIN_FUNCTIONS.get(connection.vendor)
+    if explain is None:
+        return None
+
+    sql, params = queryset.order_by().query.get_compiler(using=queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        rows = explain(cursor, sql, params)
+    return None if rows is None else int(rows)
+
+
+def get_estimated_count(queryset, limit=1000):
+    """
+    Returns the number of rows of *queryset*, counting at most
+    ``limit + 1`` of them.  The count is :data:`EXACT` up to *limit*.
+    Past it, the estimate of :func:`estimate_rows` is used if it is
+    larger, and the count is :data:`AT_LEAST` ``limit + 1`` otherwise.
+
+    :rtype: :class:`RelatedCount`
+    """
+    count = queryset.order_by()[:limit + 1].count()
+    if count <= limit:
+        return RelatedCount(count, EXACT)
+
+    estimate = estimate_rows(queryset)
+    if estimate is None or estimate < count:
+        return RelatedCount(count, AT_LEAST)
+    return RelatedCount(estimate, ESTIMATED)
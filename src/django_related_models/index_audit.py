@@ -0,0 +1,152 @@
+"""
+Checks that the columns which the related object lookups filter on are
+indexed.
+
+Every lookup of a :class:`~django_related_models.related_models.ModelMap`
+filters on the referring column, or on the content type and object id
+columns of a generic foreign key.  Without an index leading with those
+columns, the lookups are sequential scans of the referring tables.
+"""
+from collections import namedtuple
+
+from django.db import connections
+from django.db import router
+
+from .related_models import ModelMap
+from .related_models import RelatedModels
+
+#: An index leads with all of the columns of the lookup.
+INDEXED = 'indexed'
+
+#: An index leads with some, but not all, of the columns of the lookup.
+PARTIAL = 'partial'
+
+#: The columns of the lookup are only in indexes which do not lead with
+#: them, and so cannot be used for the lookup.
+NON_LEADING = 'non-leading'
+
+#: None of the indexes contain any of the columns of the lookup.
+MISSING = 'missing'
+
+_STATUS_ORDER = [INDEXED, PARTIAL, NON_LEADING, MISSING]
+
+
+class IndexAudit(namedtuple('IndexAudit', [
+        'field',
+        'table',
+        'columns',
+        'status',
+        'index',
+        'suggestion',
+        'plan'])):
+    """
+    The result of auditing the lookups through the referring *field*,
+    which filter on *columns* of *table*.  *status* is one of
+    :data:`INDEXED`, :data:`PARTIAL`, :data:`NON_LEADING` or
+    :data:`MISSING`, and *index* is the name of the best index found, if
+    any.  Unless the lookups are :data:`INDEXED`, *suggestion* is the
+    definition of an index for them.  *plan* is the output of ``EXPLAIN``
+    for a lookup, if it was asked for.
+    """
+    __slots__ = ()
+
+
+def get_lookup_columns(objects_map):
+    """
+    Returns the fields which the lookups of *objects_map* filter on, with
+    the content type first in the case of a generic foreign key.
+
+    :rtype: List[Field]
+    """
+    if objects_map.generic_foreign_key is not None:
+        ct_field = objects_map.model._meta.get_field(objects_map.generic_foreign_key.ct_field)
+        return [ct_field, objects_map.field]
+    return [objects_map.field]
+
+
+def get_index_status(columns, constraints):
+    """
+    Returns the best of the statuses of the indexes in *constraints*, as
+    returned by the database introspection, for lookups on *columns*,
+    along with the name of the index.
+
+    :rtype: Tuple[str, Optional[str]]
+    """
+    required = set(columns)
+    best = (MISSING, None)
+    for name, constraint in constraints.items():
+        if not (constraint.get('index') or constraint.get('unique') or constraint.get('primary_key')):
+            continue
+
+        index_columns = constraint['columns']
+        if set(index_columns[:len(required)]) == required:
+            status = INDEXED
+        elif index_columns and index_columns[0] in required:
+            status = PARTIAL
+        elif required & set(index_columns):
+            status = NON_LEADING
+        else:
+            continue
+
+        if _STATUS_ORDER.index(status) < _STATUS_ORDER.index(best[0]):
+            best = (status, name)
+    return best
+
+
+def get_index_suggestion(objects_map):
+    """
+    Returns the definition of an index for the lookups of *objects_map*,
+    to add to the ``Meta.indexes`` of its model.
+
+    :rtype: str
+    """
+    return "{}: models.Index(fields=[{}])".format(
+        objects_map.model._meta.label,
+        ', '.join("'{}'".format(field.name) for field in get_lookup_columns(objects_map))
+    )
+
+
+def _explain(objects_map):
+    instance = objects_map.target_model._default_manager.order_by().first()
+    if instance is None:
+        return None
+    return objects_map.get_related_objects(instance).explain()
+
+
+def audit_indexes(model, related_models=None, explain=False):
+    """
+    Returns an :class:`IndexAudit` for each field which is a (possibly
+    generic) foreign key to *model*, as found by *related_models*, which
+    defaults to a :class:`~django_related_models.related_models.RelatedModels`
+    considering every model.  Generic foreign keys are audited whether or
+    not rows point to *model* yet, since the indexes are needed once they do.
+
+    If *explain* is set, the plan of the lookup of the first instance of
+    *model*, if there is one, is included.  This requires Django 2.1.
+
+    :rtype: List[IndexAudit]
+    """
+    if related_models is None:
+        related_models = RelatedModels()
+
+    audits = []
+    for referring_model, fields in related_models.get_referring_models(model, prune_generic_foreign_keys=False).items():
+        table = referring_model._meta.db_table
+        connection = connections[router.db_for_read(referring_model)]
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+
+        for field in fields:
+            objects_map = ModelMap(model, field)
+            columns = [column_field.column for column_field in get_lookup_columns(objects_map)]
+            status, index = get_index_status(columns, constraints)
+            audits.append(IndexAudit(
+                field=field,
+                table=table,
+                columns=columns,
+                status=status,
+                index=index,
+                suggestion=get_index_suggestion(objects_map) if status != INDEXED else None,
+                plan=_explain(objects_map) if explain else None,
+            ))
+    return audits
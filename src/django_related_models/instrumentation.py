@@ -0,0 +1,186 @@
+"""
+Hooks for observing what :mod:`django_related_models.related_models` does.
+
+Observers are notified when a :class:`~.related_models.RelationGraph` is
+built, when a query for a referring field is run and when the content type
+cache of generic foreign keys is looked up.  When no observer is attached,
+nothing is timed or recorded.
+
+For example, to collect statistics and export them to a metrics pipeline::
+
+    collector = StatsCollector()
+    add_observer(collector)
+    ...
+    stats = collector.get_stats()
+"""
+import threading
+import time
+
+try:
+    timer = time.perf_counter
+except AttributeError:  # Python 2
+    timer = time.time
+
+#: The attached observers.  This list is replaced rather than modified so
+#: that it can be iterated over without a lock.
+observers = []
+_observers_lock = threading.Lock()
+
+
+class Observer(object):
+    """
+    The base class of observers.  Subclasses only need to override the
+    methods for the events they are interested in.
+    """
+
+    def graph_built(self, key, duration, graph):
+        """
+        Called when *graph* has been built for the configuration *key*
+        (see :meth:`~.related_models.RelatedModels.get_relation_graph_key`)
+        in *duration* seconds.
+        """
+
+    def query_executed(self, field, sql, duration, rows):
+        """
+        Called when a query for the referring *field* has been run in
+        *duration* seconds, returning or counting *rows* rows.  Queries
+        which cover several fields, such as grouped counts and unions, are
+        reported once for each of them.
+        """
+
+    def cache_lookup(self, field, content_type_id, hit):
+        """
+        Called when the content type cache of the generic foreign key
+        *field* is looked up for *content_type_id*.  *hit* is whether or
+        not the answer was known without a query.
+        """
+
+
+def add_observer(observer):
+    """
+    Attaches *observer* so that it is notified of every event.
+    """
+    global observers
+    with _observers_lock:
+        observers = observers + [observer]
+
+
+def remove_observer(observer):
+    """
+    Detaches *observer*.
+    """
+    global observers
+    with _observers_lock:
+        observers = [other for other in observers if other is not observer]
+
+
+class observe(object):
+    """
+    A context manager which attaches *observer* for the duration of the
+    ``with`` block.
+    """
+
+    def __init__(self, observer):
+        self.observer = observer
+
+    def __enter__(self):
+        add_observer(self.observer)
+        return self.observer
+
+    def __exit__(self, *exc_info):
+        remove_observer(self.observer)
+
+
+def notify_graph_built(key, duration, graph):
+    for observer in observers:
+        observer.graph_built(key, duration, graph)
+
+
+def notify_query_executed(field, queryset, duration, rows):
+    try:
+        sql = str(queryset.query)
+    except Exception:
+        # Some queries, such as ``__in`` lookups on an empty list, cannot
+        # be turned into SQL.
+        sql = None
+    for observer in observers:
+        observer.query_executed(field, sql, duration, rows)
+
+
+def notify_cache_lookup(field, content_type_id, hit):
+    for observer in observers:
+        observer.cache_lookup(field, content_type_id, hit)
+
+
+def _get_field_label(field):
+    return '{}.{}'.format(field.model._meta.label, field.name)
+
+
+class StatsCollector(Observer):
+    """
+    An observer which aggregates the events into statistics which can be
+    exported with :meth:`get_stats`.  It is safe to share between threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets all of the collected statistics.
+        """
+        with self._lock:
+            self._graph = {'builds': 0, 'time': 0.0}
+            self._queries = {}
+            self._cache = {}
+
+    def graph_built(self, key, duration, graph):
+        with self._lock:
+            self._graph['builds'] += 1
+            self._graph['time'] += duration
+
+    def query_executed(self, field, sql, duration, rows):
+        with self._lock:
+            stats = self._queries.setdefault(field, {
+                'queries': 0,
+                'time': 0.0,
+                'max_time': 0.0,
+                'rows': 0,
+                'slowest_sql': None,
+            })
+            stats['queries'] += 1
+            stats['time'] += duration
+            stats['rows'] += rows
+            if duration >= stats['max_time']:
+                stats['max_time'] = duration
+                stats['slowest_sql'] = sql
+
+    def cache_lookup(self, field, content_type_id, hit):
+        with self._lock:
+            stats = self._cache.setdefault(field, {'hits': 0, 'misses': 0})
+            stats['hits' if hit else 'misses'] += 1
+
+    def get_stats(self):
+        """
+        Returns a snapshot of the collected statistics, with the fields
+        identified by their ``app_label.Model.field`` labels.
+
+        :rtype: dict
+        """
+        with self._lock:
+            cache = {
+                _get_field_label(field): dict(
+                    stats,
+                    hit_rate=float(stats['hits']) / (stats['hits'] + stats['misses'])
+                )
+                for field, stats in self._cache.items()
+            }
+            return {
+                'graph': dict(self._graph),
+                'queries': {
+                    _get_field_label(field): dict(stats)
+                    for field, stats in self._queries.items()
+                },
+                'cache': cache,
+            }
@@ -0,0 +1,65 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from django_related_models.index_audit import INDEXED
+from django_related_models.index_audit import audit_indexes
+from django_related_models.related_models import RelatedModels
+from django_related_models.related_models import get_field_label
+
+
+class Command(BaseCommand):
+    help = (
+        'Reports the referring columns of a model which are not indexed, or '
+        'not usably, and suggests indexes for them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='The referred model, as app_label.ModelName.')
+        parser.add_argument(
+            '--explain', action='store_true', dest='explain',
+            help='Also print the plan of a lookup through each field.',
+        )
+        parser.add_argument(
+            '--include-app', action='append', dest='include_apps',
+            help='Only audit the fields from this app.  Can be repeated.',
+        )
+        parser.add_argument(
+            '--exclude-app', action='append', dest='exclude_apps',
+            help='Do not audit the fields from this app.  Can be repeated.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError):
+            raise CommandError('Unknown model: {}'.format(options['model']))
+
+        audits = audit_indexes(
+            model,
+            related_models=RelatedModels(
+                include_apps=options['include_apps'],
+                exclude_apps=options['exclude_apps'],
+            ),
+            explain=options['explain'],
+        )
+
+        for audit in audits:
+            self.stdout.write('{} ({}.{}): {}{}'.format(
+                get_field_label(audit.field),
+                audit.table,
+                ', '.join(audit.columns),
+                audit.status,
+                ' [{}]'.format(audit.index) if audit.index else '',
+            ))
+            if audit.suggestion:
+                self.stdout.write('    suggested index: {}'.format(audit.suggestion))
+            if audit.plan:
+                for line in audit.plan.splitlines():
+                    self.stdout.write('    {}'.format(line))
+
+        if options['verbosity'] > 0:
+            self.stderr.write('{} of {} lookups are not fully indexed.'.format(
+                len([audit for audit in audits if audit.status != INDEXED]),
+                len(audits),
+            ))
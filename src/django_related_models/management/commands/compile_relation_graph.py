@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from django_related_models.compiled_graph import get_graph_file
+from django_related_models.compiled_graph import write_model_relations
+from django_related_models.related_models import RelatedModels
+
+
+class Command(BaseCommand):
+    help = (
+        'Writes the relations between the installed models to a file which '
+        'is read instead of introspecting the models, as long as the schema '
+        'does not change.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='The file to write, defaults to the RELATED_MODELS_GRAPH_FILE setting.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['output'] or get_graph_file()
+        if not path:
+            raise CommandError('Pass --output or set RELATED_MODELS_GRAPH_FILE.')
+
+        relations = RelatedModels().scan_model_relations()
+        write_model_relations(relations, path)
+        if options['verbosity'] > 0:
+            self.stdout.write('Wrote the relations of {} models to {}'.format(len(relations), path))
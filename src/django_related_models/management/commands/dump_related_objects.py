@@ -0,0 +1,135 @@
+import gzip
+import json
+import time
+
+from django.apps import apps
+from django.core import serializers
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from django_related_models.related_models import RelatedModels
+from django_related_models.related_models import get_field_label
+from django_related_models.related_models import iter_related_objects
+
+
+class TextOutput(object):
+    """
+    A binary file writing the UTF-8 text of the bytes written to it to the
+    text stream *stream*, such as the ``stdout`` of a command.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, data):
+        self.stream.write(data.decode('utf-8'), ending='')
+
+    def flush(self):
+        self.stream.flush()
+
+
+class Command(BaseCommand):
+    help = (
+        'Streams every object related to an instance as newline-delimited '
+        'JSON, one serialized object per line.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='The model of the instance, as app_label.ModelName.')
+        parser.add_argument('pk', help='The primary key of the instance.')
+        parser.add_argument(
+            '--output', '-o',
+            help='The file to write to, defaults to stdout.',
+        )
+        parser.add_argument(
+            '--gzip', action='store_true', dest='gzip',
+            help='Compress the output with gzip.',
+        )
+        parser.add_argument(
+            '--include-app', action='append', dest='include_apps',
+            help='Only dump objects from this app.  Can be repeated.',
+        )
+        parser.add_argument(
+            '--exclude-app', action='append', dest='exclude_apps',
+            help='Do not dump objects from this app.  Can be repeated.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='The number of rows fetched and serialized at a time.',
+        )
+
+    def get_instance(self, label, pk):
+        try:
+            model = apps.get_model(label)
+        except (LookupError, ValueError):
+            raise CommandError('Unknown model: {}'.format(label))
+
+        try:
+            return model._default_manager.get(pk=pk)
+        except (model.DoesNotExist, ValueError):
+            raise CommandError('{} matching pk={} does not exist.'.format(label, pk))
+
+    def open_output(self, path, compress):
+        """
+        Returns a binary file for *path*, or for the stdout of the command
+        if *path* is not given, and whether it should be closed.
+        """
+        if path:
+            if compress:
+                return gzip.open(path, 'wb'), True
+            return open(path, 'wb'), True
+
+        # The stdout of the command can be any text stream, such as the one
+        # given to call_command(), which only has text and no binary buffer.
+        buffer = getattr(self.stdout, 'buffer', None)
+        if buffer is None:
+            if compress:
+                raise CommandError('Compressed output can only be written to a file or to a binary stdout.')
+            return TextOutput(self.stdout), False
+
+        self.stdout.flush()
+        if compress:
+            return gzip.GzipFile(fileobj=buffer, mode='wb'), True
+        return buffer, False
+
+    def handle(self, *args, **options):
+        instance = self.get_instance(options['model'], options['pk'])
+        related_models = RelatedModels(
+            include_apps=options['include_apps'],
+            exclude_apps=options['exclude_apps'],
+        )
+        verbosity = options['verbosity']
+
+        output, close = self.open_output(options['output'], options['gzip'])
+        counts = {}
+        start = time.time()
+        try:
+            related_objects = iter_related_objects(
+                instance,
+                chunk_size=options['chunk_size'],
+                chunked=True,
+                related_models=related_models,
+            )
+            for field, chunk in related_objects:
+                label = get_field_label(field)
+                for data in serializers.serialize('python', chunk):
+                    data['field'] = field.name
+                    line = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True) + '\n'
+                    output.write(line.encode('utf-8'))
+                counts[label] = counts.get(label, 0) + len(chunk)
+                if verbosity > 1:
+                    self.stderr.write('{}: {} objects'.format(label, counts[label]))
+            output.flush()
+        finally:
+            if close:
+                output.close()
+
+        if verbosity > 0:
+            for label in sorted(counts):
+                self.stderr.write('{}: {}'.format(label, counts[label]))
+            self.stderr.write('Dumped {} objects from {} fields in {:.2f}s'.format(
+                sum(counts.values()),
+                len(counts),
+                time.time() - start,
+            ))
@@ -1,6 +1,300 @@
+import operator
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections import namedtuple
+from functools import reduce
+from itertools import islice
+
+try:
+    from queue import Empty
+    from queue import Queue
+except ImportError:  # Python 2
+    from Queue import Empty
+    from Queue import Queue
+
+try:
+    string_types = basestring  # noqa: F821
+except NameError:  # Python 3
+    string_types = str
+
+import django
 from django.apps import apps
+from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.fields import GenericRelation
 from django.contrib.contenttypes.models import ContentType
+from django.core.signals import setting_changed
+from django.db import DatabaseError
+from django.db import connections
+from django.db import router
+from django.db import transaction
+from django.db.models import Case
+from django.db.models import IntegerField
+from django.db.models import Q
+from django.db.models import Sum
+from django.db.models import Value
+from django.db.models import When
+from django.db.models.signals import class_prepared
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_migrate
+from django.db.models.signals import post_save
+
+from . import compiled_graph
+from . import instrumentation
+from .compact import CompactRelatedObjects
+from .estimates import get_estimated_count
+from .timeouts import PartialRelatedObjects
+from .timeouts import statement_timeout
+
+#: The process-wide cache of :class:`RelationGraph` objects, keyed by
+#: :meth:`RelatedModels.get_relation_graph_key`.
+_relation_graph_cache = {}
+_relation_graph_lock = threading.RLock()
+
+#: The process-wide cache of :class:`LookupPlan` objects, keyed by the
+#: type of the instances looked up and the referring field.
+_lookup_plan_cache = {}
+
+
+def clear_relation_graph_cache(**kwargs):
+    """
+    Clears the process-wide cache of :class:`RelationGraph` objects, as
+    well as the :class:`LookupPlan` objects, so that they will be rebuilt
+    on their next use.
+
+    This is connected to :data:`~django.db.models.signals.class_prepared`
+    and to changes of the ``INSTALLED_APPS`` setting so that the cache is
+    reset whenever the app registry changes.
+    """
+    with _relation_graph_lock:
+        _relation_graph_cache.clear()
+        _lookup_plan_cache.clear()
+
+
+def clear_lookup_plan_cache(**kwargs):
+    """
+    Clears the process-wide cache of :class:`LookupPlan` objects.
+
+    This is connected to :data:`~django.db.models.signals.post_migrate`,
+    after which the content types, whose ids the plans hold, may have
+    been recreated.
+    """
+    with _relation_graph_lock:
+        _lookup_plan_cache.clear()
+
+
+def _clear_relation_graph_cache_on_setting_changed(setting, **kwargs):
+    if setting == 'INSTALLED_APPS':
+        clear_relation_graph_cache()
+
+
+class_prepared.connect(
+    clear_relation_graph_cache,
+    weak=False,
+    dispatch_uid='django_related_models.clear_relation_graph_cache',
+)
+setting_changed.connect(
+    _clear_relation_graph_cache_on_setting_changed,
+    weak=False,
+    dispatch_uid='django_related_models.clear_relation_graph_cache',
+)
+post_migrate.connect(
+    clear_lookup_plan_cache,
+    weak=False,
+    dispatch_uid='django_related_models.clear_lookup_plan_cache',
+)
+
+
+def _iterator(queryset, chunk_size):
+    """
+    Returns ``queryset.iterator()`` fetching *chunk_size* rows at a time
+    on the versions of Django which support it.
+    """
+    if django.VERSION < (2, 0):
+        return queryset.iterator()
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def _evaluate(field, queryset, func=list, rows=len):
+    """
+    Returns ``func(queryset)``, reporting the query for *field* to the
+    observers in :mod:`~django_related_models.instrumentation`, if there
+    are any.  *rows* returns the number of rows from the result.
+    """
+    if not instrumentation.observers:
+        return func(queryset)
+
+    start = instrumentation.timer()
+    result = func(queryset)
+    instrumentation.notify_query_executed(
+        field, queryset, instrumentation.timer() - start, rows(result)
+    )
+    return result
+
+
+def _iterate(field, queryset, chunk_size):
+    """
+    Returns :func:`_iterator` for *queryset*, reporting the query for
+    *field* to the observers in
+    :mod:`~django_related_models.instrumentation`, if there are any, once
+    it has been consumed.  Only the time spent fetching rows is counted.
+    """
+    iterator = _iterator(queryset, chunk_size)
+    if not instrumentation.observers:
+        return iterator
+    return _observe_iterator(field, queryset, iterator)
+
+
+def _observe_iterator(field, queryset, iterator):
+    duration = 0.0
+    rows = 0
+    try:
+        while True:
+            start = instrumentation.timer()
+            try:
+                obj = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                duration += instrumentation.timer() - start
+            rows += 1
+            yield obj
+    finally:
+        instrumentation.notify_query_executed(field, queryset, duration, rows)
+
+
+def _chunks(iterable, chunk_size):
+    """
+    Yields lists of at most *chunk_size* items from *iterable*.
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, chunk_size))
+
+
+def _iter_pk_ranges(queryset, batch_size, start_after=None):
+    """
+    Yields the ``(first, last)`` primary keys of consecutive batches of at
+    most *batch_size* rows of *queryset*, in primary key order, starting
+    after the primary key *start_after* if it is given.
+
+    The next batch is only looked up once the previous one has been
+    consumed, so the rows may be modified in between.
+    """
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    last = start_after
+    while True:
+        batch = queryset if last is None else queryset.filter(pk__gt=last)
+        pks = list(batch[:batch_size])
+        if not pks:
+            return
+        yield pks[0], pks[-1]
+        last = pks[-1]
+
+
+def _atomic(aliases, func):
+    """
+    Calls *func* inside of a transaction on each of the database
+    *aliases* and returns its result.
+    """
+    if not aliases:
+        return func()
+    with transaction.atomic(using=aliases[0]):
+        return _atomic(aliases[1:], func)
+
+
+#: The largest number of querysets combined into a single ``UNION ALL``
+#: query by :func:`get_related_pks`.  SQLite, for instance, does not allow
+#: more than 500 by default.
+MAX_UNION_SIZE = 100
+
+#: The erasure policy which deletes the related rows.
+DELETE = 'delete'
+
+#: The erasure policy which sets the foreign keys of the related rows to
+#: ``NULL``.
+NULLIFY = 'nullify'
+
+_INTEGER_FIELD_TYPES = {
+    'AutoField',
+    'BigAutoField',
+    'BigIntegerField',
+    'IntegerField',
+    'PositiveBigIntegerField',
+    'PositiveIntegerField',
+    'PositiveSmallIntegerField',
+    'SmallAutoField',
+    'SmallIntegerField',
+}
+
+
+def get_field_label(field):
+    """
+    Returns the ``app_label.Model.field`` label of *field*.
+
+    :rtype: str
+    """
+    return '{}.{}'.format(field.model._meta.label, field.name)
+
+
+def get_field_by_label(label):
+    """
+    Returns the field whose :func:`get_field_label` is *label*.
+
+    :rtype: Field
+    """
+    model_label, name = label.rsplit('.', 1)
+    return compiled_graph.get_model_field(apps.get_model(model_label), name)
+
+
+def get_content_type_id(model, using=None):
+    """
+    Returns the id of the content type of *model* which the rows of
+    generic foreign keys on the database *using* refer to.  It is looked
+    up on *using* if the database routers allow content types there, and
+    on the database they pick for reading content types otherwise.
+
+    :rtype: int
+    """
+    if using is not None and router.allow_migrate_model(using, ContentType):
+        return ContentType.objects.db_manager(using).get_for_model(model).id
+    return ContentType.objects.get_for_model(model).id
+
+
+def _get_pk_type(model):
+    """
+    Returns the internal type of the primary key of *model*, following
+    primary keys which are foreign keys, with all of the integer types
+    reported as ``'IntegerField'``.
+    """
+    pk = model._meta.pk
+    while pk.remote_field is not None:
+        pk = pk.target_field
+    internal_type = pk.get_internal_type()
+    if internal_type in _INTEGER_FIELD_TYPES:
+        return 'IntegerField'
+    return internal_type
+
+
+def _get_union_key(queryset):
+    """
+    Returns a key such that querysets with the same key can be combined
+    into a single ``UNION ALL`` query selecting their primary keys, or
+    ``None`` if *queryset* cannot be combined with any other.
+    """
+    query = queryset.query
+    if getattr(query, 'combinator', None) or query.low_mark or query.high_mark is not None:
+        return None
+
+    connection = connections[queryset.db]
+    if not getattr(connection.features, 'supports_select_union', True):
+        return None
+
+    return (queryset.db, _get_pk_type(queryset.model))
 
 
 class GetDefaultManagerMixin(object):
@@ -64,47 +358,680 @@ class ModelMap(GetDefaultManagerMixin, object):
         model = model or self.model
         return super(ModelMap, self).get_default_manager(model)
 
-    def get_related_objects(self, instance, **kwargs):
+    def get_databases(self, **hints):
+        """
+        Returns the aliases of all of the databases which rows of
+        :attr:`model` can live on, which are the ones a database router
+        explicitly allows it to be migrated to.  *hints* are passed on to
+        the routers' ``allow_migrate`` so that, for instance, a shard key
+        can rule out some of the databases.  Databases which no router has
+        an opinion about, such as read replicas, and test mirrors are left
+        out, since they would return the same rows again.  If the routers do
+        not allow any database, as without routers or with unmanaged models,
+        the one the routers pick for reading is returned.
+
+        :rtype: List[str]
+        """
+        opts = self.model._meta
+        aliases = []
+        for alias in connections:
+            if connections[alias].settings_dict.get('TEST', {}).get('MIRROR'):
+                continue
+            for db_router in router.routers:
+                allow_migrate = getattr(db_router, 'allow_migrate', None)
+                allow = None if allow_migrate is None else allow_migrate(
+                    alias, opts.app_label, model_name=opts.model_name, model=self.model, **hints
+                )
+                if allow is not None:
+                    break
+            else:
+                allow = False
+            if allow:
+                aliases.append(alias)
+        return aliases or [router.db_for_read(self.model, **hints)]
+
+    def get_target_value(self, instance):
+        """
+        Returns the value of :attr:`target_field` on *instance*, which is
+        the value stored in :attr:`field` by the rows associated to
+        *instance*.
+        """
+        return getattr(instance, self.target_field.attname)
+
+    def get_filter_kwargs(self, **kwargs):
+        """
+        Returns *kwargs* as filters for :attr:`model`.  In the case of a
+        generic foreign key, a filter on the content type of
+        :attr:`target_model` is added.
+
+        :rtype: dict
+        """
+        # If we have a generic foreign key, we need to additionally
+        # filter by the content type of the target model
+        if self.generic_foreign_key is not None:
+            content_type = ContentType.objects.get_for_model(self.target_model)
+            kwargs = dict({
+                self.generic_foreign_key.ct_field: content_type
+            }, **kwargs)
+        return kwargs
+
+    def get_related_filter_kwargs(self, instance, **kwargs):
+        """
+        Returns the filters for the rows of :attr:`model` which are
+        associated to *instance*, with any *kwargs* added to them.
+
+        :rtype: dict
+        """
+        return self.get_filter_kwargs(**dict({
+            self.field.name: self.get_target_value(instance)
+        }, **kwargs))
+
+    def get_queryset(self, **kwargs):
+        """
+        Returns a :class:`~django.db.models.QuerySet` for :attr:`model`
+        filtered by :meth:`get_filter_kwargs`.
+
+        :rtype: :class:`django.db.models.QuerySet`
+        """
+        return self.get_default_manager().filter(**self.get_filter_kwargs(**kwargs))
+
+    def get_related_objects(self, instance, fields=None, pk_only=False, **kwargs):
         """
         Returns a :class:`~django.db.models.QuerySet` for :attr:`model`
         for the rows that are associated to *instance*.
 
+        If *pk_only* is set, the queryset only returns the primary keys of
+        the rows.  Otherwise, if a list of *fields* is given, it returns a
+        tuple of their values for each row.  In both cases, only those
+        columns are selected and no model instances are created.
+
         Any *kwargs* passed in will be additional filters applied to the
         queryset.
 
         :type instance: :attr:`model`
         :rtype: :class:`django.db.models.QuerySet`
         """
-        # If we have a generic foreign key, we need to additionally
-        # filter by the content type of the target model
+        queryset = self.get_default_manager().filter(
+            **self.get_related_filter_kwargs(instance, **kwargs)
+        )
+        if pk_only:
+            return queryset.values_list('pk', flat=True)
+        if fields:
+            return queryset.values_list(*fields)
+        return queryset
+
+    def reassign_related_objects(self, source, target, batch_size=None, **kwargs):
+        """
+        Updates the rows of :attr:`model` which are associated to *source*
+        so that they are associated to *target* instead, and returns the
+        number of rows updated.  In the case of a generic foreign key, only
+        the object id is updated and only for the rows with the content
+        type of :attr:`target_model`.
+
+        The rows are updated with a single query unless *batch_size* is
+        given, in which case they are updated in primary key ranges of at
+        most *batch_size* rows, each in its own transaction, so that locks
+        are only held briefly.
+
+        Any *kwargs* passed in will be additional filters applied to the
+        update.
+
+        :rtype: int
+        """
+        queryset = self.get_related_objects(source, **kwargs)
+        values = {self.field.attname: self.get_target_value(target)}
+        if batch_size is None:
+            return queryset.update(**values)
+
+        using = router.db_for_write(self.model)
+        count = 0
+        for first, last in _iter_pk_ranges(queryset, batch_size):
+            with transaction.atomic(using=using):
+                count += queryset.filter(pk__gte=first, pk__lte=last).update(**values)
+        return count
+
+    def get_accessor_name(self):
+        """
+        Returns the name of the attribute of :attr:`target_model` which
+        manages the rows of :attr:`model` associated to an instance, which
+        is the reverse accessor of a foreign key or, in the case of a
+        generic foreign key, the matching
+        :class:`~django.contrib.contenttypes.fields.GenericRelation`.
+        Returns ``None`` if there is no such attribute, or if it is a
+        reverse one-to-one accessor.
+
+        :rtype: Optional[str]
+        """
         if self.generic_foreign_key is not None:
-            content_type = ContentType.objects.get_for_model(self.target_model)
-            kwargs = dict({
-                self.generic_foreign_key.ct_field: content_type
+            for field in compiled_graph.get_private_fields(self.target_model._meta):
+                if (
+                    isinstance(field, GenericRelation) and
+                    field.related_model is self.model and
+                    field.object_id_field_name == self.generic_foreign_key.fk_field and
+                    field.content_type_field_name == self.generic_foreign_key.ct_field
+                ):
+                    return field.name
+            return None
+
+        remote_field = self.field.remote_field
+        if self.field.one_to_one or (remote_field.related_name or '').endswith('+'):
+            return None
+        return remote_field.get_accessor_name()
+
+    def attach_related_objects(self, instance, related_objects):
+        """
+        Stores *related_objects*, the rows of :attr:`model` associated to
+        *instance*, in the prefetch cache of *instance*, as
+        :meth:`~django.db.models.query.QuerySet.prefetch_related` does, so
+        that its :meth:`get_accessor_name` manager returns them without a
+        query.  In the case of a foreign key, *instance* is also cached on
+        each of the related objects.  Returns whether or not the objects
+        could be attached.
+
+        :rtype: bool
+        """
+        accessor_name = self.get_accessor_name()
+        if accessor_name is None:
+            return False
+
+        cache_name = accessor_name
+        if self.generic_foreign_key is None:
+            if django.VERSION < (2, 0):
+                cache_name = self.field.related_query_name()
+            for obj in related_objects:
+                setattr(obj, self.field.name, instance)
+
+        queryset = getattr(instance, accessor_name).get_queryset()
+        queryset._result_cache = list(related_objects)
+        queryset._prefetch_done = True
+        if not hasattr(instance, '_prefetched_objects_cache'):
+            instance._prefetched_objects_cache = {}
+        instance._prefetched_objects_cache[cache_name] = queryset
+        return True
+
+    def get_nullify_values(self):
+        """
+        Returns the values which detach a row of :attr:`model` from the
+        instance it is associated to.  In the case of a generic foreign
+        key, both the object id and the content type are cleared.
+
+        :raises ValueError: if the columns are not nullable.
+        :rtype: dict
+        """
+        fields = [self.field]
+        if self.generic_foreign_key is not None:
+            fields.append(self.model._meta.get_field(self.generic_foreign_key.ct_field))
+
+        not_nullable = [field.name for field in fields if not field.null]
+        if not_nullable:
+            raise ValueError('Cannot nullify {}, which is not nullable.'.format(
+                ', '.join('{}.{}'.format(self.model._meta.label, name) for name in not_nullable)
+            ))
+        return {field.attname: None for field in fields}
+
+    def erase_related_objects(
+            self,
+            instance,
+            policy=DELETE,
+            batch_size=1000,
+            sleep=0,
+            start_after=None,
+            on_batch=None,
+            **kwargs):
+        """
+        Deletes or updates the rows of :attr:`model` which are associated
+        to *instance*, and returns the number of rows which were processed.
+
+        *policy* is either :data:`DELETE`, :data:`NULLIFY`, or a
+        dictionary of the values to update the rows with, e.g. to
+        anonymize them.  Deleting the rows also deletes or updates the
+        rows referring to them, as with
+        :meth:`~django.db.models.query.QuerySet.delete`, but only the rows
+        of :attr:`model` are counted.
+
+        The rows are processed in primary key order, in batches of at most
+        *batch_size* rows, each in its own transaction, pausing *sleep*
+        seconds between batches so that locks are only held briefly and
+        the database is not saturated.  Only the rows after the primary
+        key *start_after* are processed and, after each batch is
+        committed, *on_batch* is called with the last primary key of the
+        batch, so that an interrupted erasure can be resumed.
+
+        Any *kwargs* passed in will be additional filters applied to the
+        rows.
+
+        :rtype: int
+        """
+        if policy == NULLIFY:
+            values = self.get_nullify_values()
+        elif policy == DELETE:
+            values = None
+        else:
+            values = policy
+
+        queryset = self.get_related_objects(instance, **kwargs)
+        using = router.db_for_write(self.model)
+        count = 0
+        for i, (first, last) in enumerate(_iter_pk_ranges(queryset, batch_size, start_after=start_after)):
+            if i and sleep:
+                time.sleep(sleep)
+
+            batch = queryset.filter(pk__gte=first, pk__lte=last)
+            with transaction.atomic(using=using):
+                if values is None:
+                    deleted, rows_by_model = batch.delete()
+                    count += rows_by_model.get(self.model._meta.label, 0)
+                else:
+                    count += batch.update(**values)
+            if on_batch is not None:
+                on_batch(last)
+        return count
+
+    def get_lookup_cost(self):
+        """
+        Returns a rough, sortable estimate of the cost of looking up the
+        rows associated to an instance.  Lookups on an indexed column are
+        cheaper than those on generic foreign keys, which also filter on
+        the content type, and both are cheaper than unindexed lookups.
+
+        :rtype: tuple
+        """
+        indexed = self.field.db_index or self.field.unique
+        return (not indexed, self.generic_foreign_key is not None)
+
+    def get_lookup_plan(self):
+        """
+        Returns a :class:`LookupPlan` with everything needed to look up
+        the rows of :attr:`model` which are associated to an instance
+        resolved ahead of time.
+
+        :rtype: :class:`LookupPlan`
+        """
+        if self.generic_foreign_key is not None:
+            ct_field = self.model._meta.get_field(self.generic_foreign_key.ct_field)
+            content_type_attname = ct_field.attname
+            content_type_id = ContentType.objects.get_for_model(self.target_model).id
+        else:
+            content_type_attname = None
+            content_type_id = None
+
+        return LookupPlan(
+            field=self.generic_foreign_key or self.field,
+            manager=self.get_default_manager(),
+            attname=self.field.attname,
+            target_attname=self.target_field.attname,
+            content_type_attname=content_type_attname,
+            content_type_id=content_type_id,
+            lookup_cost=self.get_lookup_cost(),
+        )
+
+    def get_batch_size(self, reserved=0):
+        """
+        Returns the largest number of values which can be passed in a
+        single ``__in`` lookup on :attr:`field` without going over the
+        query parameter limit of the database backend, keeping *reserved*
+        parameters for the other filters.  Returns ``None`` if the backend
+        does not have a limit.
+
+        :rtype: Optional[int]
+        """
+        connection = connections[self.get_default_manager().db]
+        max_query_params = getattr(connection.features, 'max_query_params', None)
+        if not max_query_params:
+            return None
+        if self.generic_foreign_key is not None:
+            reserved += 1
+        return max(max_query_params - reserved, 1)
+
+    def get_related_objects_bulk(self, instances, batch_size=None, **kwargs):
+        """
+        Returns a dictionary mapping each of *instances* to the list of
+        rows of :attr:`model` which are associated to it.  Instances
+        without any associated rows are left out.
+
+        Rather than a query per instance, this issues a single
+        ``__in`` query for every *batch_size* instances.  If *batch_size*
+        is not given, :meth:`get_batch_size` is used.
+
+        Any *kwargs* passed in will be additional filters applied to the
+        queries.
+
+        :rtype: Dict[Model, List[Object]]
+        """
+        instances_by_value = OrderedDict()
+        for instance in instances:
+            value = self.field.to_python(self.get_target_value(instance))
+            if value is None:
+                continue
+            # The rows of an instance given twice are only added once.
+            value_instances = instances_by_value.setdefault(value, [])
+            if instance not in value_instances:
+                value_instances.append(instance)
+
+        values = list(instances_by_value)
+        batch_size = batch_size or self.get_batch_size(reserved=len(kwargs)) or len(values)
+
+        related_objects = {}
+        for start in range(0, len(values), batch_size):
+            filters = dict({
+                self.field.name + '__in': values[start:start + batch_size]
             }, **kwargs)
+            queryset = self.get_queryset(**filters)
+            for obj in _evaluate(self.generic_foreign_key or self.field, queryset):
+                value = self.field.to_python(getattr(obj, self.field.attname))
+                for instance in instances_by_value.get(value, ()):
+                    related_objects.setdefault(instance, []).append(obj)
+        return related_objects
+
+
+class LookupPlan(namedtuple('LookupPlan', [
+        'field',
+        'manager',
+        'attname',
+        'target_attname',
+        'content_type_attname',
+        'content_type_id',
+        'lookup_cost'])):
+    """
+    An immutable, precompiled version of the lookups of a
+    :class:`ModelMap`, as returned by :meth:`ModelMap.get_lookup_plan`.
+
+    :attr:`field` is the referring (possibly generic) foreign key and
+    :attr:`manager` is the default manager of its model.  The rows
+    associated to an instance are the ones whose :attr:`attname` column
+    holds the :attr:`target_attname` value of the instance, and whose
+    :attr:`content_type_attname` column holds :attr:`content_type_id`
+    in the case of a generic foreign key.
+    """
+    __slots__ = ()
+
+    def get_filter_kwargs(self, instance, **kwargs):
+        """
+        Returns the filters for the rows which are associated to
+        *instance*, with any *kwargs* added to them.
+
+        :rtype: dict
+        """
+        kwargs.setdefault(self.attname, getattr(instance, self.target_attname))
+        if self.content_type_attname is not None:
+            kwargs.setdefault(self.content_type_attname, self.content_type_id)
+        return kwargs
+
+    def get_related_objects(self, instance, fields=None, pk_only=False, **kwargs):
+        """
+        Same as :meth:`ModelMap.get_related_objects`.
+
+        :rtype: :class:`django.db.models.QuerySet`
+        """
+        queryset = self.manager.filter(**self.get_filter_kwargs(instance, **kwargs))
+        if pk_only:
+            return queryset.values_list('pk', flat=True)
+        if fields:
+            return queryset.values_list(*fields)
+        return queryset
+
+
+def get_lookup_plan(instance_type, field):
+    """
+    Returns the :class:`LookupPlan` for the rows which are associated
+    through *field* to instances of *instance_type*.  Plans are built once
+    and shared by the whole process.
+
+    :rtype: :class:`LookupPlan`
+    """
+    key = (instance_type, field)
+    plan = _lookup_plan_cache.get(key)
+    if plan is None:
+        plan = ModelMap(instance_type, field).get_lookup_plan()
+        with _relation_graph_lock:
+            _lookup_plan_cache[key] = plan
+    return plan
+
+
+class RelationGraph(object):
+    """
+    A reverse index from every model to the fields on other models which
+    are (or could be) foreign keys to it.
+
+    Concrete foreign keys are indexed by the model they point to in
+    :attr:`referring_fields`.  Generic foreign keys could point to any
+    model, so they are kept per model in :attr:`generic_fields` and
+    still need to be checked against the database.
+    """
+
+    def __init__(self):
+        self.models = []
+        self.referring_fields = {}
+        self.generic_fields = OrderedDict()
+
+    def add_model(self, other_model):
+        self.models.append(other_model)
+
+    def add_field(self, model, other_model, field):
+        """
+        Records that *field* on *other_model* is a foreign key to *model*.
+        """
+        fields_by_model = self.referring_fields.setdefault(model, OrderedDict())
+        fields_by_model.setdefault(other_model, []).append(field)
+
+    def add_generic_field(self, other_model, field):
+        """
+        Records that *field* on *other_model* is a generic foreign key.
+        """
+        generic_fields = self.generic_fields.setdefault(other_model, [])
+        if field not in generic_fields:
+            generic_fields.append(field)
+
+    def get_candidate_models(self, model):
+        """
+        Returns all of the models which have fields that are (or could be)
+        foreign keys to *model*, in the order in which they were added to
+        the graph.
+
+        :rtype: List[Model]
+        """
+        candidates = set(self.referring_fields.get(model, ()))
+        candidates.update(self.generic_fields)
+        return [other_model for other_model in self.models if other_model in candidates]
+
+
+class GenericForeignKeyCache(object):
+    """
+    A thread-safe cache of the content types which are referenced by the
+    rows behind generic foreign keys.
+
+    By default, the first lookup for a field runs a single
+    ``SELECT DISTINCT`` over its content type column.  With
+    *use_exists* set, an indexed ``EXISTS`` probe is run for each
+    content type instead, which is much cheaper on very large tables.
+
+    The cache is kept up to date through the
+    :data:`~django.db.models.signals.post_save` and
+    :data:`~django.db.models.signals.post_delete` signals of the models
+    holding the generic foreign keys.  Since bulk operations, raw SQL and
+    other processes do not send these signals, entries can also be given
+    a *timeout* in seconds after which they are looked up again.
+    *timeout* can also be a callable returning it, so that it is read from
+    a setting on each use.
+    """
+
+    def __init__(self, timeout=None, use_exists=False):
+        self.timeout = timeout
+        self.use_exists = use_exists
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._fields_by_model = {}
+
+    def _get_entry(self, field):
+        entry = self._entries.get(field)
+        if entry is not None and entry.expires is not None and entry.expires <= time.time():
+            entry = None
+        if entry is None:
+            timeout = self.timeout() if callable(self.timeout) else self.timeout
+            expires = time.time() + timeout if timeout is not None else None
+            entry = self._entries[field] = _GenericForeignKeyCacheEntry(expires)
+            self._connect(field)
+        return entry
+
+    def _connect(self, field):
+        fields = self._fields_by_model.setdefault(field.model, set())
+        if not fields:
+            dispatch_uid = 'django_related_models.GenericForeignKeyCache.{}'.format(id(self))
+            post_save.connect(self._post_save, sender=field.model, dispatch_uid=dispatch_uid)
+            post_delete.connect(self._post_delete, sender=field.model, dispatch_uid=dispatch_uid)
+        fields.add(field)
+
+    def _get_content_type_id(self, field, instance):
+        ct_field = field.model._meta.get_field(field.ct_field)
+        return getattr(instance, ct_field.attname)
+
+    def _post_save(self, sender, instance, **kwargs):
+        with self._lock:
+            for field in self._fields_by_model.get(sender, ()):
+                entry = self._entries.get(field)
+                if entry is not None:
+                    entry.add(self._get_content_type_id(field, instance))
+
+    def _post_delete(self, sender, instance, **kwargs):
+        with self._lock:
+            for field in self._fields_by_model.get(sender, ()):
+                entry = self._entries.get(field)
+                if entry is not None:
+                    entry.discard(self._get_content_type_id(field, instance))
+
+    def has_content_type(self, field, content_type_id, manager):
+        """
+        Returns whether or not any of the rows of *manager* reference
+        *content_type_id* through the generic foreign key *field*.
+
+        :rtype: bool
+        """
+        with self._lock:
+            entry = self._get_entry(field)
+            result = entry.lookup(content_type_id)
+            probe = self.use_exists or entry.complete
+        if instrumentation.observers:
+            instrumentation.notify_cache_lookup(field, content_type_id, result is not None)
+        if result is not None:
+            return result
+
+        if probe:
+            exists = manager.filter(**{field.ct_field: content_type_id}).exists()
+            with self._lock:
+                entry.set(content_type_id, exists)
+            return exists
+
+        content_type_ids = set(
+            manager.values_list(field.ct_field, flat=True).order_by().distinct()
+        )
+        with self._lock:
+            entry.set_all(content_type_ids)
+        return content_type_id in content_type_ids
+
+    def clear(self, field=None):
+        """
+        Forgets what is known about *field*, or about every field if
+        *field* is ``None``.
+        """
+        with self._lock:
+            if field is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(field, None)
+
+
+class _GenericForeignKeyCacheEntry(object):
+    """
+    What is known about the content types referenced by one generic
+    foreign key.  Content types whose rows have been deleted since the
+    entry was complete are kept in :attr:`stale` until they are probed.
+    """
+
+    def __init__(self, expires):
+        self.expires = expires
+        self.complete = False
+        self.present = set()
+        self.absent = set()
+        self.stale = set()
+
+    def lookup(self, content_type_id):
+        if content_type_id in self.stale:
+            return None
+        if content_type_id in self.present:
+            return True
+        if content_type_id in self.absent or self.complete:
+            return False
+        return None
+
+    def set(self, content_type_id, exists):
+        self.stale.discard(content_type_id)
+        if exists:
+            self.present.add(content_type_id)
+            self.absent.discard(content_type_id)
+        else:
+            self.absent.add(content_type_id)
+            self.present.discard(content_type_id)
+
+    def set_all(self, content_type_ids):
+        self.complete = True
+        self.present = set(content_type_ids)
+        self.absent = set()
+        self.stale = set()
+
+    def add(self, content_type_id):
+        self.set(content_type_id, True)
+
+    def discard(self, content_type_id):
+        if content_type_id in self.present:
+            self.present.discard(content_type_id)
+            self.stale.add(content_type_id)
+
+
+#: The number of seconds :data:`default_generic_foreign_key_cache` trusts
+#: what it knows about a generic foreign key, unless the
+#: ``RELATED_MODELS_GFK_CACHE_TIMEOUT`` setting says otherwise.
+DEFAULT_GFK_CACHE_TIMEOUT = 60
+
+
+def get_gfk_cache_timeout():
+    """
+    Returns the timeout of :data:`default_generic_foreign_key_cache`, from
+    the ``RELATED_MODELS_GFK_CACHE_TIMEOUT`` setting.
+
+    :rtype: Optional[float]
+    """
+    return getattr(settings, 'RELATED_MODELS_GFK_CACHE_TIMEOUT', DEFAULT_GFK_CACHE_TIMEOUT)
+
 
-        kwargs = dict({
-            self.field.name: getattr(instance, self.target_field.name)
-        }, **kwargs)
-        return self.get_default_manager().filter(**kwargs)
+#: A process-wide :class:`GenericForeignKeyCache`, whose entries expire
+#: after :func:`get_gfk_cache_timeout` seconds, for the
+#: :class:`RelatedModels` which opt into pruning generic foreign keys.
+default_generic_foreign_key_cache = GenericForeignKeyCache(timeout=get_gfk_cache_timeout)
 
 
 class RelatedModels(GetDefaultManagerMixin, object):
     """
     This class is designed to help finding all of the other models
     related to a given model.
+
+    Generic foreign keys could point to any model, so by default they are
+    always looked up.  With a *generic_foreign_key_cache*, such as
+    :data:`default_generic_foreign_key_cache`, the ones without any rows
+    pointing to a model are left out instead, at the cost of missing the
+    rows written without signals until the cache entries expire.
     """
     def __init__(
             self,
             include=None,
             include_apps=None,
             exclude=None,
-            exclude_apps=None):
+            exclude_apps=None,
+            generic_foreign_key_cache=None):
         self.include = include
         self.include_apps = include_apps
         self.exclude = set(exclude or [])
         self.exclude_apps = set(exclude_apps or [])
-        self.generic_foreign_key_cache = {}
+        self.generic_foreign_key_cache = generic_foreign_key_cache
 
     def _model_matches(self, model, model_list, app_list):
         """
@@ -159,8 +1086,9 @@ class RelatedModels(GetDefaultManagerMixin, object):
 
         Currently, we only support
         :class:`~django.contrib.contenttypes.fields.GenericForeignKey`
-        field.  Additionally, we check to see if there are rows in
-        the database which reference *model*.
+        field.  Additionally, with a :attr:`generic_foreign_key_cache`,
+        we check to see if there are rows in the database which reference
+        *model*.
 
         :rtype: bool
         """
@@ -174,26 +1102,21 @@ class RelatedModels(GetDefaultManagerMixin, object):
         Returns whether or not the generic foreign key *field* has any
         references to *model*.
 
-        We cache the content types which are referenced by *field*
-        into :attr:`generic_foreign_key_cache`.
+        The content types which are referenced by *field* are cached in
+        :attr:`generic_foreign_key_cache`.  Without one, *field* is
+        always assumed to have references to *model*, so that no rows are
+        missed.
 
         :rtype: bool
         """
-        content_type_ids = self.generic_foreign_key_cache.get(field)
-        if content_type_ids is None:
-            content_type_ids = set(
-                self.get_default_manager(field.model).values_list(
-                    field.ct_field,
-                    flat=True
-                ).order_by().distinct()
-            )
-            self.generic_foreign_key_cache[field] = content_type_ids
-
-        if not content_type_ids:
-            return False
-
+        if self.generic_foreign_key_cache is None:
+            return True
         ct = ContentType.objects.get_for_model(model)
-        return ct.id in content_type_ids
+        return self.generic_foreign_key_cache.has_content_type(
+            field,
+            ct.id,
+            self.get_default_manager(field.model)
+        )
 
     def has_virutal_fields(self, model):
         return hasattr(model._meta, 'virtual_fields')
@@ -211,54 +1134,934 @@ class RelatedModels(GetDefaultManagerMixin, object):
         real_fields = [
             field
             for field in other_model._meta.get_fields()
-            if self.should_include_field(field, model)
+            if self.should_include_field(field, model) and (
+                not isinstance(field, GenericForeignKey) or
+                self.should_include_virtual_field(field, model)
+            )
         ]
 
         if self.has_virutal_fields(other_model):
             virtual_fields = [
                 field
                 for field in other_model._meta.virtual_fields
-                if self.should_include_virtual_field(field, model)
+                if field not in real_fields and self.should_include_virtual_field(field, model)
             ]
             return real_fields + virtual_fields
         else:
             return real_fields
 
-    def get_referring_models(self, model):
+    def get_relation_graph_key(self):
+        """
+        Returns the key under which the :class:`RelationGraph` for this
+        configuration is cached.  Instances with the same class and the
+        same include / exclude settings share a graph.
+
+        :rtype: tuple
+        """
+        def freeze(values):
+            return frozenset(values) if values is not None else None
+
+        return (
+            type(self),
+            freeze(self.include),
+            freeze(self.include_apps),
+            freeze(self.exclude),
+            freeze(self.exclude_apps),
+        )
+
+    def build_relation_graph(self):
+        """
+        Returns a :class:`RelationGraph` of the fields which should be
+        considered, from :meth:`get_model_relations`.
+
+        :rtype: :class:`RelationGraph`
+        """
+        graph = RelationGraph()
+        for other_model, fields, generic_fields in self.get_model_relations():
+            if not self.should_consider(other_model):
+                continue
+
+            graph.add_model(other_model)
+            for field in fields:
+                graph.add_field(field.related_model, other_model, field)
+            for field in generic_fields:
+                graph.add_generic_field(other_model, field)
+        return graph
+
+    def get_model_relations(self):
+        """
+        Returns the relations of every installed model as returned by
+        :meth:`scan_model_relations`.
+
+        They are read from the file compiled by the
+        ``compile_relation_graph`` management command instead, if the
+        ``RELATED_MODELS_GRAPH_FILE`` setting points to one which matches
+        the current schema.  Since the file only records the fields
+        accepted by :meth:`RelatedModels.should_include_field`, subclasses
+        which override it always scan the models.
+
+        :rtype: List[Tuple[Model, List[Field], List[GenericForeignKey]]]
+        """
+        if type(self).should_include_field == RelatedModels.should_include_field:
+            relations = compiled_graph.load_model_relations()
+            if relations is not None:
+                return relations
+        return self.scan_model_relations()
+
+    def scan_model_relations(self):
+        """
+        Scans every installed model which should be considered and returns
+        a ``(model, fields, generic_fields)`` tuple for each of them, with
+        the foreign keys and the generic foreign keys of the model.
+
+        :rtype: List[Tuple[Model, List[Field], List[GenericForeignKey]]]
+        """
+        relations = []
+        for other_model in apps.get_models(include_auto_created=True):
+            if not self.should_consider(other_model):
+                continue
+
+            fields = []
+            generic_fields = []
+            for field in other_model._meta.get_fields():
+                if isinstance(field, GenericForeignKey):
+                    if self.should_include_field(field, None):
+                        generic_fields.append(field)
+                    continue
+
+                related_model = getattr(field, 'related_model', None)
+                if related_model is None:
+                    continue
+                if self.should_include_field(field, related_model):
+                    fields.append(field)
+
+            if self.has_virutal_fields(other_model):
+                generic_fields.extend(
+                    field
+                    for field in other_model._meta.virtual_fields
+                    if isinstance(field, GenericForeignKey) and field not in generic_fields
+                )
+            relations.append((other_model, fields, generic_fields))
+        return relations
+
+    def get_relation_graph(self):
+        """
+        Returns the :class:`RelationGraph` for this configuration.  It is
+        built once and then shared by the whole process until the app
+        registry changes.
+
+        :rtype: :class:`RelationGraph`
+        """
+        key = self.get_relation_graph_key()
+        graph = _relation_graph_cache.get(key)
+        if graph is None:
+            with _relation_graph_lock:
+                graph = _relation_graph_cache.get(key)
+                if graph is None:
+                    start = instrumentation.timer() if instrumentation.observers else None
+                    graph = self.build_relation_graph()
+                    _relation_graph_cache[key] = graph
+                    if start is not None:
+                        instrumentation.notify_graph_built(key, instrumentation.timer() - start, graph)
+        return graph
+
+    def get_referring_models(self, model, prune_generic_foreign_keys=True):
         """
         Returns all of the models which have a (possibly generic)foreign key to
         *model*.
 
+        The candidate fields come from the cached :meth:`get_relation_graph`,
+        so only the (cached) checks of generic foreign keys against the
+        database are done on every call.  If *prune_generic_foreign_keys*
+        is not set, these checks are skipped and every generic foreign key
+        is returned, for instance because its rows may live on other
+        databases than the one the checks run on.
+
         :rtype: Dict[Model, List[Field]]
         """
-        referring_models = {
-            other_model: self.get_related_fields(model, other_model)
-            for other_model in apps.get_models(include_auto_created=True)
-            if self.should_consider(other_model)
-        }
-        return {
-            other_model: fields
-            for other_model, fields in referring_models.items()
-            if fields
-        }
+        graph = self.get_relation_graph()
+        referring_fields = graph.referring_fields.get(model, {})
+
+        referring_models = {}
+        for other_model in graph.get_candidate_models(model):
+            fields = list(referring_fields.get(other_model, ()))
+            fields.extend(
+                field
+                for field in graph.generic_fields.get(other_model, ())
+                if not prune_generic_foreign_keys or self.should_include_virtual_field(field, model)
+            )
+            if fields:
+                referring_models[other_model] = fields
+        return referring_models
 
 
-def get_related_objects(instance, **kwargs):
+def get_related_querysets(
+        instance,
+        fields=None,
+        pk_only=False,
+        related_models=None,
+        select_related=None,
+        prefetch_related=None,
+        using=None,
+        prune_generic_foreign_keys=True,
+        **kwargs):
+    """
+    Returns a :class:`~django.db.models.QuerySet` for each field which is
+    a (possibly generic) foreign key to *instance*, for the rows that are
+    associated to *instance*.  None of the querysets are evaluated.
+
+    *fields* and *pk_only* are passed on to
+    :meth:`ModelMap.get_related_objects`.  *fields* can also be a
+    dictionary mapping referring models to the fields to select from
+    them; the rows of the models which are not in it are returned as
+    model instances.
+
+    *select_related* and *prefetch_related* are dictionaries mapping
+    referring models to the lookups passed to
+    :meth:`~django.db.models.query.QuerySet.select_related` and
+    :meth:`~django.db.models.query.QuerySet.prefetch_related` for their
+    rows, which are model instances.
+
+    If *using* is given, the querysets run on that database, and the
+    rows of generic foreign keys are matched against the content type of
+    *instance* there; see :func:`get_content_type_id`.
+
+    The referring models are found with *related_models*, which defaults
+    to a :class:`RelatedModels` considering every model, and
+    *prune_generic_foreign_keys* is passed on to
+    :meth:`RelatedModels.get_referring_models`.
+
+    :rtype: List[Tuple[Field, QuerySet]]
+    """
+    model = instance._meta.model
+    if related_models is None:
+        related_models = RelatedModels()
+    referring_models = related_models.get_referring_models(
+        model,
+        prune_generic_foreign_keys=prune_generic_foreign_keys
+    )
+
+    querysets = []
+    for reffering_model, model_fields in referring_models.items():
+        if isinstance(fields, dict):
+            values_fields = fields.get(reffering_model)
+        else:
+            values_fields = fields
+        select_lookups = (select_related or {}).get(reffering_model)
+        prefetch_lookups = (prefetch_related or {}).get(reffering_model)
+
+        for field in model_fields:
+            plan = get_lookup_plan(type(instance), field)
+            field_kwargs = kwargs
+            if using is not None and plan.content_type_attname is not None:
+                field_kwargs = dict({
+                    plan.content_type_attname: get_content_type_id(model, using)
+                }, **kwargs)
+            queryset = plan.get_related_objects(
+                instance,
+                fields=values_fields,
+                pk_only=pk_only,
+                **field_kwargs
+            )
+            if using is not None:
+                queryset = queryset.using(using)
+            if not pk_only and not values_fields:
+                if select_lookups:
+                    queryset = queryset.select_related(*select_lookups)
+                if prefetch_lookups:
+                    queryset = queryset.prefetch_related(*prefetch_lookups)
+            querysets.append((field, queryset))
+    return querysets
+
+
+#: The keyword arguments of :func:`get_related_querysets` which are not
+#: filters of the rows.
+_RELATED_QUERYSETS_OPTIONS = {
+    'related_models',
+    'select_related',
+    'prefetch_related',
+    'using',
+    'prune_generic_foreign_keys',
+}
+
+
+def get_related_objects(instance, fields=None, pk_only=False, attach=False, **kwargs):
     """
     Returns all the instances of all the models which have a (possibly generic) foreign key to
     *instance*.
 
+    If *pk_only* is set, only their primary keys are returned.  If
+    *fields* is given, tuples of the values of those fields are returned
+    instead; see :func:`get_related_querysets`.
+
+    If *attach* is set, the related objects of every field, including the
+    ones without any, are also stored in the prefetch cache of *instance*
+    with :meth:`ModelMap.attach_related_objects`, so that going through
+    its reverse relations does not issue any queries.  Along with the
+    *select_related* and *prefetch_related* options of
+    :func:`get_related_querysets`, this loads everything needed to walk
+    the related objects in a fixed number of queries.  Since the reverse
+    relations would then only return some of their rows, *attach* cannot
+    be combined with filters.
+
+    :rtype: Dict[Field, List[Object]]
+    """
+    if attach and (fields or pk_only):
+        raise ValueError('Only model instances can be attached, not fields or primary keys.')
+    if attach and set(kwargs).difference(_RELATED_QUERYSETS_OPTIONS):
+        raise ValueError('Only the related objects of all of the rows can be attached, not filtered ones.')
+
+    all_related_objects = {}
+    for field, queryset in get_related_querysets(instance, fields=fields, pk_only=pk_only, **kwargs):
+        related_objects = _evaluate(field, queryset)
+        if attach:
+            ModelMap(type(instance), field).attach_related_objects(instance, related_objects)
+        if related_objects:
+            all_related_objects[field] = related_objects
+    return all_related_objects
+
+
+def get_related_pks(instance, union=True, **kwargs):
+    """
+    Returns the primary keys of all the instances of all the models which
+    have a (possibly generic) foreign key to *instance*.  This is the same
+    as ``get_related_objects(instance, pk_only=True)``, but the order of
+    the primary keys is not defined.
+
+    If *union* is set, the per-field queries are combined into a single
+    ``UNION ALL`` query whose rows are the primary key and the position of
+    the field they belong to.  Queries which cannot be combined, because
+    the backend does not support it, the primary keys are of different
+    types or the default manager slices its queryset, fall back to one
+    query per field.
+
+    :rtype: Dict[Field, List[Any]]
+    """
+    querysets = get_related_querysets(instance, **kwargs)
+    results = [[] for i in querysets]
+
+    indexes_by_key = OrderedDict()
+    for index, (field, queryset) in enumerate(querysets):
+        key = _get_union_key(queryset) if union else None
+        indexes_by_key.setdefault(key, []).append(index)
+
+    for key, indexes in indexes_by_key.items():
+        if key is None:
+            for index in indexes:
+                field, queryset = querysets[index]
+                results[index] = _evaluate(field, queryset.values_list('pk', flat=True))
+            continue
+
+        for chunk in _chunks(indexes, MAX_UNION_SIZE):
+            branches = [
+                querysets[index][1].order_by().annotate(
+                    related_models_field_index=Value(index, output_field=IntegerField())
+                ).values_list('pk', 'related_models_field_index')
+                for index in chunk
+            ]
+            union_queryset = branches[0].union(*branches[1:], all=True)
+            start = instrumentation.timer() if instrumentation.observers else None
+            for pk, index in union_queryset:
+                results[index].append(pk)
+            if start is not None:
+                duration = instrumentation.timer() - start
+                for index in chunk:
+                    instrumentation.notify_query_executed(
+                        querysets[index][0], union_queryset, duration, len(results[index])
+                    )
+
+    return {
+        field: pks
+        for (field, queryset), pks in zip(querysets, results)
+        if pks
+    }
+
+
+def get_compact_related_objects(instance, chunk_size=2000, **kwargs):
+    """
+    Returns the primary keys of all the instances of all the models which
+    have a (possibly generic) foreign key to *instance*, as a
+    :class:`~django_related_models.compact.CompactRelatedObjects` keyed by
+    field.
+
+    The primary keys are streamed from the database in order,
+    *chunk_size* at a time, straight into packed arrays, so that even
+    millions of related rows take little memory.
+
+    :rtype: :class:`~django_related_models.compact.CompactRelatedObjects`
+    """
+    result = CompactRelatedObjects()
+    for field, queryset in get_related_querysets(instance, pk_only=True, **kwargs):
+        queryset = queryset.order_by('pk')
+        result.add(
+            field,
+            queryset.model,
+            _iterate(field, queryset, chunk_size),
+            integer=_get_pk_type(queryset.model) == 'IntegerField'
+        )
+    return result
+
+
+def _evaluate_concurrently(querysets, max_workers):
+    """
+    Evaluates each of the ``(field, queryset)`` in *querysets* on up to
+    *max_workers* threads, each with its own database connection, and
+    returns their results in the same order.  The connections are closed
+    once the worker threads are done, and the first error raised by a
+    query, if any, is raised again.
+
+    Other connections cannot see the rows written by a transaction which
+    has not been committed yet, so if any of the databases of *querysets*
+    is in a transaction, the querysets are evaluated one after another on
+    the connections of the current thread instead.
+
+    :rtype: List[List[Object]]
+    """
+    if any(connections[queryset.db].in_atomic_block for field, queryset in querysets):
+        return [_evaluate(field, queryset) for field, queryset in querysets]
+
+    tasks = Queue()
+    for index, (field, queryset) in enumerate(querysets):
+        tasks.put((index, field, queryset))
+
+    results = [None] * len(querysets)
+    errors = []
+
+    def work():
+        try:
+            while not errors:
+                try:
+                    index, field, queryset = tasks.get_nowait()
+                except Empty:
+                    return
+                results[index] = _evaluate(field, queryset)
+        except Exception:
+            errors.append(sys.exc_info()[1])
+        finally:
+            connections.close_all()
+
+    workers = [
+        threading.Thread(target=work)
+        for i in range(min(max_workers, len(querysets)))
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    if errors:
+        raise errors[0]
+    return results
+
+
+def get_related_objects_parallel(instance, max_workers=4, using=None, **kwargs):
+    """
+    Returns the same result as :func:`get_related_objects`, but runs the
+    per-field queries on up to *max_workers* threads, each with its own
+    database connection.  The connections are closed once the worker
+    threads are done, even if a query fails.
+
+    *using* can be a database alias or a non-empty list of aliases, such
+    as read replicas, which the queries are spread over in turn.  If it is
+    not given, the database routers decide where each query runs.
+
+    Inside of a transaction, the queries are run one after another so that
+    they see its rows; see :func:`_evaluate_concurrently`.
+
     :rtype: Dict[Field, List[Object]]
     """
+    if using is None or isinstance(using, string_types):
+        aliases = [using]
+    else:
+        aliases = list(using)
+    if not aliases:
+        raise ValueError('At least one database alias is needed.')
+
+    querysets = []
+    for index, (field, queryset) in enumerate(get_related_querysets(instance, **kwargs)):
+        alias = aliases[index % len(aliases)]
+        querysets.append((field, queryset if alias is None else queryset.using(alias)))
+
+    results = _evaluate_concurrently(querysets, max_workers)
+    return {
+        field: related_objects
+        for (field, queryset), related_objects in zip(querysets, results)
+        if related_objects
+    }
+
+
+def get_related_objects_sharded(instance, max_workers=4, hints=None, **kwargs):
+    """
+    Returns the same result as :func:`get_related_objects`, but looks up
+    the rows of each referring model on every database it can live on,
+    according to :meth:`ModelMap.get_databases`, so that rows spread over
+    several shards are all found.  The queries are run on up to
+    *max_workers* threads, see :func:`get_related_objects_parallel`, and
+    the rows from the different databases are concatenated in the order
+    of the database aliases.
+
+    *hints* are passed on to the database routers, for instance with a
+    shard key, so that they can rule out the databases which cannot hold
+    any of the rows.
+
+    Generic foreign keys are not pruned, since their rows may only live on
+    some of the databases, and their content types are looked up on each
+    database; see :func:`get_content_type_id`.
+
+    :rtype: Dict[Field, List[Object]]
+    """
+    hints = hints or {}
+    databases = {}
+    querysets = []
+    for alias in connections:
+        for field, queryset in get_related_querysets(
+                instance, using=alias, prune_generic_foreign_keys=False, **kwargs):
+            if field not in databases:
+                databases[field] = ModelMap(type(instance), field).get_databases(**hints)
+            if alias in databases[field]:
+                querysets.append((field, queryset))
+
+    all_related_objects = {}
+    for (field, queryset), related_objects in zip(querysets, _evaluate_concurrently(querysets, max_workers)):
+        if related_objects:
+            all_related_objects.setdefault(field, []).extend(related_objects)
+    return all_related_objects
+
+
+def get_related_objects_with_timeout(instance, timeout, field_timeout=None, **kwargs):
+    """
+    Returns the same result as :func:`get_related_objects`, within a
+    budget of *timeout* seconds, as a
+    :class:`~django_related_models.timeouts.PartialRelatedObjects`.
+
+    Each query runs with a statement timeout of what is left of the budget,
+    or of *field_timeout* seconds if that is less, on the backends which
+    support it (see :func:`~django_related_models.timeouts.statement_timeout`).
+    The fields whose query is cancelled are marked as timed out, and once
+    the budget is spent, the remaining fields are marked as skipped
+    without being queried.
+
+    :rtype: :class:`~django_related_models.timeouts.PartialRelatedObjects`
+    """
+    deadline = instrumentation.timer() + timeout
+    all_related_objects = PartialRelatedObjects()
+    for field, queryset in get_related_querysets(instance, **kwargs):
+        remaining = deadline - instrumentation.timer()
+        if remaining <= 0:
+            all_related_objects.skipped.append(field)
+            continue
+
+        query_timeout = remaining if field_timeout is None else min(remaining, field_timeout)
+        start = instrumentation.timer()
+        try:
+            with statement_timeout(queryset.db, query_timeout):
+                related_objects = _evaluate(field, queryset)
+        except DatabaseError:
+            # Only errors past the deadline of the query are timeouts.
+            if instrumentation.timer() - start < query_timeout:
+                raise
+            all_related_objects.timed_out.append(field)
+            continue
+
+        if related_objects:
+            all_related_objects[field] = related_objects
+    return all_related_objects
+
+
+def get_related_objects_bulk(instances, related_models=None, **kwargs):
+    """
+    Returns, for each of *instances*, all the instances of all the models
+    which have a (possibly generic) foreign key to it.  The value for each
+    instance has the same shape as the result of :func:`get_related_objects`.
+
+    Only one query per referring field (per batch of instances) is
+    issued, no matter how many *instances* are given.  The referring
+    models are found with *related_models*, which defaults to a
+    :class:`RelatedModels` considering every model.
+
+    :rtype: Dict[Model, Dict[Field, List[Object]]]
+    """
+    all_related_objects = OrderedDict((instance, {}) for instance in instances)
+
+    instances_by_type = OrderedDict()
+    for instance in all_related_objects:
+        instances_by_type.setdefault(type(instance), []).append(instance)
+
+    if related_models is None:
+        related_models = RelatedModels()
+    for instance_type, type_instances in instances_by_type.items():
+        model = instance_type._meta.model
+        referring_models = related_models.get_referring_models(model)
+        for reffering_model, fields in referring_models.items():
+            for field in fields:
+                objects_map = ModelMap(instance_type, field)
+                related_objects = objects_map.get_related_objects_bulk(type_instances, **kwargs)
+                for instance, objects in related_objects.items():
+                    all_related_objects[instance][field] = objects
+    return all_related_objects
+
+
+def iter_related_objects(instance, chunk_size=2000, chunked=False, **kwargs):
+    """
+    Lazily yields ``(field, obj)`` for all the instances of all the models
+    which have a (possibly generic) foreign key to *instance*.  If
+    *chunked* is set, ``(field, objs)`` is yielded instead, where *objs*
+    is a list of at most *chunk_size* instances.
+
+    Unlike :func:`get_related_objects`, the rows are streamed from the
+    database *chunk_size* at a time, so memory use does not grow with the
+    number of related rows.
+
+    :rtype: Iterator[Tuple[Field, Object]]
+    """
+    for field, queryset in get_related_querysets(instance, **kwargs):
+        related_objects = _iterate(field, queryset, chunk_size)
+        if chunked:
+            for chunk in _chunks(related_objects, chunk_size):
+                yield field, chunk
+        else:
+            for obj in related_objects:
+                yield field, obj
+
+
+def get_related_counts(instance, group_by_model=False, related_models=None, **kwargs):
+    """
+    Returns the number of instances of each model which have a (possibly
+    generic) foreign key to *instance*, without fetching any rows.  Like
+    :func:`get_related_objects`, fields without any rows are left out.
+
+    By default, a ``COUNT(*)`` query is issued per field.  If
+    *group_by_model* is set, all of the fields of a referring model are
+    counted with a single conditional aggregate query instead.
+
+    The referring models are found with *related_models*, which defaults
+    to a :class:`RelatedModels` considering every model.
+
+    :rtype: Dict[Field, int]
+    """
     model = instance._meta.model
-    related_models = RelatedModels()
+    if related_models is None:
+        related_models = RelatedModels()
     referring_models = related_models.get_referring_models(model)
 
-    all_related_objects = {}
+    all_related_counts = {}
+    for reffering_model, fields in referring_models.items():
+        plans = [get_lookup_plan(type(instance), field) for field in fields]
+        if group_by_model and len(plans) > 1:
+            counts = _get_grouped_related_counts(plans, instance, **kwargs)
+        else:
+            counts = [
+                _evaluate(
+                    plan.field,
+                    plan.get_related_objects(instance, **kwargs),
+                    func=lambda queryset: queryset.count(),
+                    rows=int
+                )
+                for plan in plans
+            ]
+
+        for field, count in zip(fields, counts):
+            if count:
+                all_related_counts[field] = count
+    return all_related_counts
+
+
+def _get_grouped_related_counts(plans, instance, **kwargs):
+    """
+    Returns the number of rows associated to *instance* for each of the
+    lookup *plans*, which must all be for the same model, using a single
+    query.
+
+    :rtype: List[int]
+    """
+    conditions = [
+        Q(**plan.get_filter_kwargs(instance, **kwargs))
+        for plan in plans
+    ]
+    aggregates = OrderedDict(
+        ('related_count_{}'.format(i), Sum(Case(
+            When(condition, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField()
+        )))
+        for i, condition in enumerate(conditions)
+    )
+    queryset = plans[0].manager.filter(reduce(operator.or_, conditions))
+    start = instrumentation.timer() if instrumentation.observers else None
+    counts = queryset.aggregate(**aggregates)
+    counts = [counts[alias] or 0 for alias in aggregates]
+    if start is not None:
+        duration = instrumentation.timer() - start
+        for plan, count in zip(plans, counts):
+            instrumentation.notify_query_executed(plan.field, queryset, duration, count)
+    return counts
+
+
+def get_estimated_related_counts(instance, limit=1000, related_models=None, **kwargs):
+    """
+    Returns an approximate number of instances of each model which have a
+    (possibly generic) foreign key to *instance*, for referring tables too
+    large for :func:`get_related_counts`.  Fields without any rows are
+    left out.
+
+    Each field is counted with
+    :func:`~django_related_models.estimates.get_estimated_count`: exactly
+    up to *limit* rows, and past it from the row estimate of the query
+    planner where there is one.
+
+    The referring models are found with *related_models*, which defaults
+    to a :class:`RelatedModels` considering every model.
+
+    :rtype: Dict[Field, :class:`~django_related_models.estimates.RelatedCount`]
+    """
+    model = instance._meta.model
+    if related_models is None:
+        related_models = RelatedModels()
+    referring_models = related_models.get_referring_models(model)
+
+    all_related_counts = {}
     for reffering_model, fields in referring_models.items():
         for field in fields:
-            objects_map = ModelMap(type(instance), field)
-            related_objects = objects_map.get_related_objects(instance, **kwargs)
-            if related_objects:
-                all_related_objects[field] = [obj for obj in related_objects]
+            plan = get_lookup_plan(type(instance), field)
+            count = _evaluate(
+                field,
+                plan.get_related_objects(instance, **kwargs),
+                func=lambda queryset: get_estimated_count(queryset, limit),
+                rows=lambda count: count.value
+            )
+            if count.value:
+                all_related_counts[field] = count
+    return all_related_counts
+
+
+def find_related_field(instance, related_models=None, **kwargs):
+    """
+    Returns the first field found which is a (possibly generic) foreign
+    key to *instance* from at least one row, or ``None`` if nothing refers
+    to *instance*.
+
+    An ``EXISTS`` query is issued per field, starting with the cheapest
+    ones according to :meth:`ModelMap.get_lookup_cost`, and no further
+    queries are issued once a row is found.
+
+    The referring models are found with *related_models*, which defaults
+    to a :class:`RelatedModels` considering every model.  If it prunes
+    generic foreign keys, its :class:`GenericForeignKeyCache` should be
+    created with *use_exists* set, so that the first call does not scan
+    the whole content type column of every generic foreign key.
+
+    :rtype: Optional[Field]
+    """
+    model = instance._meta.model
+    if related_models is None:
+        related_models = RelatedModels()
+    referring_models = related_models.get_referring_models(model)
+
+    plans = [
+        get_lookup_plan(type(instance), field)
+        for reffering_model, fields in referring_models.items()
+        for field in fields
+    ]
+    plans.sort(key=lambda plan: plan.lookup_cost)
+    for plan in plans:
+        queryset = plan.get_related_objects(instance, **kwargs)
+        if _evaluate(plan.field, queryset, func=lambda queryset: queryset.exists(), rows=int):
+            return plan.field
+    return None
+
+
+def has_related_objects(instance, **kwargs):
+    """
+    Returns whether or not there are any instances of any model which have
+    a (possibly generic) foreign key to *instance*.  See
+    :func:`find_related_field`.
+
+    :rtype: bool
+    """
+    return find_related_field(instance, **kwargs) is not None
+
+
+def get_reachable_objects(instance, max_depth=None, related_models=None):
+    """
+    Returns all the instances which can be reached from *instance* by
+    following (possibly generic) foreign keys backwards: the instances
+    which refer to *instance*, the instances which refer to those, and so
+    on, up to *max_depth* levels deep.  The result has the same shape as
+    the result of :func:`get_related_objects`.
+
+    The graph is walked breadth-first, and the instances of each level are
+    looked up with one ``__in`` query per referring field (see
+    :func:`get_related_objects_bulk`).  Each instance is only visited once,
+    so cycles are not followed.
+
+    The models which are followed can be limited by passing a
+    :class:`RelatedModels` with the appropriate include / exclude
+    settings as *related_models*.
+
+    :rtype: Dict[Field, List[Object]]
+    """
+    related_models = related_models or RelatedModels()
+
+    def get_key(obj):
+        return (obj._meta.concrete_model, obj.pk)
+
+    visited = {get_key(instance)}
+    all_related_objects = OrderedDict()
+
+    level = [instance]
+    depth = 0
+    while level and (max_depth is None or depth < max_depth):
+        depth += 1
+
+        instances_by_type = OrderedDict()
+        for obj in level:
+            instances_by_type.setdefault(type(obj), []).append(obj)
+
+        level = []
+        for instance_type, type_instances in instances_by_type.items():
+            model = instance_type._meta.model
+            referring_models = related_models.get_referring_models(model)
+            for reffering_model, fields in referring_models.items():
+                for field in fields:
+                    objects_map = ModelMap(instance_type, field)
+                    related_objects = objects_map.get_related_objects_bulk(type_instances)
+                    for objects in related_objects.values():
+                        for obj in objects:
+                            key = get_key(obj)
+                            if key in visited:
+                                continue
+                            visited.add(key)
+                            all_related_objects.setdefault(field, []).append(obj)
+                            level.append(obj)
     return all_related_objects
+
+
+def reassign_related_objects(source, target, batch_size=None, related_models=None, **kwargs):
+    """
+    Updates all the instances of all the models which have a (possibly
+    generic) foreign key to *source* so that they point to *target*
+    instead, and returns the number of rows updated per field.  Fields
+    without any rows updated are left out.
+
+    One ``UPDATE`` query is issued per field, all inside of a single
+    transaction.  If *batch_size* is given, the rows of each field are
+    instead updated in primary key ranges of at most *batch_size* rows,
+    each in its own transaction; see
+    :meth:`ModelMap.reassign_related_objects`.
+
+    The referring models are found with *related_models*, which defaults
+    to a :class:`RelatedModels` considering every model.
+
+    :rtype: Dict[Field, int]
+    """
+    model = source._meta.model
+    if target._meta.concrete_model is not source._meta.concrete_model:
+        raise ValueError(
+            'Cannot reassign the objects related to {!r} to {!r}, which is of a different model.'.format(
+                source, target
+            )
+        )
+
+    if related_models is None:
+        related_models = RelatedModels()
+    referring_models = related_models.get_referring_models(model)
+    objects_maps = [
+        (field, ModelMap(type(source), field))
+        for reffering_model, fields in referring_models.items()
+        for field in fields
+    ]
+
+    def reassign():
+        all_counts = {}
+        for field, objects_map in objects_maps:
+            count = objects_map.reassign_related_objects(source, target, batch_size=batch_size, **kwargs)
+            if count:
+                all_counts[field] = count
+        return all_counts
+
+    if batch_size is not None:
+        return reassign()
+
+    aliases = sorted({
+        router.db_for_write(objects_map.model)
+        for field, objects_map in objects_maps
+    })
+    return _atomic(aliases, reassign)
+
+
+def erase_related_objects(
+        instance,
+        policies=None,
+        default_policy=DELETE,
+        batch_size=1000,
+        sleep=0,
+        checkpoint=None,
+        on_checkpoint=None,
+        related_models=None,
+        **kwargs):
+    """
+    Deletes or updates all the instances of all the models which have a
+    (possibly generic) foreign key to *instance*, and returns the number of
+    rows processed per field.  Fields without any rows processed are left
+    out.
+
+    *policies* maps referring fields to their policy, see
+    :meth:`ModelMap.erase_related_objects`; the other fields use
+    *default_policy*.  The rows of every field are processed in batches
+    of at most *batch_size* rows, each in its own transaction, pausing
+    *sleep* seconds between batches.
+
+    *checkpoint* is a dictionary keyed by :func:`get_field_label`, which
+    is updated in place with the last primary key processed for each
+    field, or ``None`` once all of its rows have been processed, and
+    passed to *on_checkpoint* after every batch so that it can be saved.
+    Passing a saved checkpoint back in resumes the erasure where it
+    stopped.
+
+    The referring models are found with *related_models*, which defaults
+    to a :class:`RelatedModels` considering every model.
+
+    :raises ValueError: if a field should be nullified but is not
+        nullable.  This is checked before any row is processed.
+    :rtype: Dict[Field, int]
+    """
+    policies = policies or {}
+    checkpoint = checkpoint if checkpoint is not None else {}
+    if related_models is None:
+        related_models = RelatedModels()
+
+    referring_models = related_models.get_referring_models(instance._meta.model)
+    objects_maps = [
+        (field, ModelMap(type(instance), field), policies.get(field, default_policy))
+        for reffering_model, fields in referring_models.items()
+        for field in fields
+        if checkpoint.get(get_field_label(field), True) is not None
+    ]
+    for field, objects_map, policy in objects_maps:
+        if policy == NULLIFY:
+            objects_map.get_nullify_values()
+
+    all_counts = {}
+    for field, objects_map, policy in objects_maps:
+        label = get_field_label(field)
+
+        def on_batch(last, label=label):
+            checkpoint[label] = last
+            if on_checkpoint is not None:
+                on_checkpoint(checkpoint)
+
+        count = objects_map.erase_related_objects(
+            instance,
+            policy=policy,
+            batch_size=batch_size,
+            sleep=sleep,
+            start_after=checkpoint.get(label),
+            on_batch=on_batch,
+            **kwargs
+        )
+        checkpoint[label] = None
+        if on_checkpoint is not None:
+            on_checkpoint(checkpoint)
+        if count:
+            all_counts[field] = count
+    return all_counts
@@ -0,0 +1,284 @@
+"""
+An opt-in cache of the results of
+:func:`~django_related_models.related_models.get_related_objects` and
+:func:`~django_related_models.related_models.get_related_pks`, backed by
+the Django cache framework.
+
+Entries are keyed by the instance, the kind of lookup and its filters,
+along with a version per instance.  The versions are deleted by
+:data:`~django.db.models.signals.post_save` and
+:data:`~django.db.models.signals.post_delete` handlers on the referring
+models, for both the instances the saved row pointed to when it was
+loaded and the ones it points to now, so that the entries of exactly those
+instances are invalidated.  Bulk operations such as
+:meth:`~django.db.models.query.QuerySet.update` do not send these signals,
+which is what the *timeout* of the entries is for.
+"""
+import hashlib
+import threading
+import uuid
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.base import BaseCache
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_init
+from django.db.models.signals import post_save
+
+from .related_models import ModelMap
+from .related_models import RelatedModels
+from .related_models import get_field_by_label
+from .related_models import get_field_label
+from .related_models import get_related_objects
+from .related_models import get_related_pks
+
+
+def _hash(*parts):
+    return hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+
+
+class RelatedObjectsCache(object):
+    """
+    Caches the related objects of instances in the Django cache *cache*,
+    which is either a cache alias or a cache object, for *timeout* seconds
+    (the default timeout of the cache unless it is given).
+
+    The referring models are found with *related_models*, which defaults
+    to a :class:`~django_related_models.related_models.RelatedModels`
+    considering every model.  Only the instances of *models* can be looked
+    up, and by default these are all of the models referred to by another.
+
+    The entries are shared by every process using the cache, including the
+    ones which only write the referring rows, so the signal handlers of the
+    models referring to *models* are connected right away.  Since they need
+    the relation graph, the cache must be created once the app registry is
+    ready, e.g. in :meth:`~django.apps.AppConfig.ready`.
+    """
+
+    def __init__(self, cache='default', timeout=DEFAULT_TIMEOUT, key_prefix='related_models', related_models=None,
+                 models=None):
+        self.cache = cache if isinstance(cache, BaseCache) else caches[cache]
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+        self.related_models = related_models or RelatedModels()
+        self._lock = threading.Lock()
+        self._target_attnames = {}
+        self._fields_by_model = {}
+        self._initial_attr = '_related_objects_cache_{}'.format(id(self))
+        self.reset_stats()
+
+        if models is None:
+            models = list(self.related_models.get_relation_graph().referring_fields)
+            self._models = None
+        else:
+            self._models = {model._meta.concrete_model for model in models}
+        for model in models:
+            self.watch(model)
+
+    def reset_stats(self):
+        """
+        Resets the hit, miss and invalidation counters.
+        """
+        with self._lock:
+            self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get_stats(self):
+        """
+        Returns the number of hits, misses and invalidations since the
+        last :meth:`reset_stats`, along with the hit rate.
+
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = float(stats['hits']) / lookups if lookups else 0.0
+        return stats
+
+    def _count(self, stat, count=1):
+        with self._lock:
+            self._stats[stat] += count
+
+    def watch(self, model):
+        """
+        Connects the signal handlers of the models referring to *model*,
+        and returns the attnames of the fields of *model* which they
+        point to.  This is done for every model of the cache when it is
+        created.
+
+        :rtype: List[str]
+        """
+        target_attnames = self._target_attnames.get(model)
+        if target_attnames is not None:
+            return target_attnames
+
+        graph = self.related_models.get_relation_graph()
+        fields = [
+            field
+            for fields in graph.referring_fields.get(model, {}).values()
+            for field in fields
+        ]
+        # Generic foreign keys are watched even when none of their rows
+        # point to *model* yet, since the first one to do so must
+        # invalidate the entries too.
+        fields.extend(
+            field
+            for generic_fields in graph.generic_fields.values()
+            for field in generic_fields
+        )
+
+        with self._lock:
+            for field in fields:
+                self._connect(field)
+            target_attnames = sorted({ModelMap(model, field).target_field.attname for field in fields})
+            self._target_attnames[model] = target_attnames
+        return target_attnames
+
+    def _connect(self, field):
+        fields = self._fields_by_model.setdefault(field.model, set())
+        if not fields:
+            dispatch_uid = 'django_related_models.RelatedObjectsCache.{}'.format(id(self))
+            post_init.connect(self._post_init, sender=field.model, dispatch_uid=dispatch_uid)
+            post_save.connect(self._post_save, sender=field.model, dispatch_uid=dispatch_uid)
+            post_delete.connect(self._post_delete, sender=field.model, dispatch_uid=dispatch_uid)
+        fields.add(ModelMap(field.model, field))
+
+    def _get_version_keys(self, sender, values):
+        """
+        Returns the keys of the versions of the instances which the row of
+        *sender* with the column *values* points to.
+        """
+        keys = set()
+        for objects_map in self._fields_by_model.get(sender, ()):
+            value = values.get(objects_map.field.attname)
+            if value is None:
+                continue
+
+            if objects_map.generic_foreign_key is not None:
+                ct_field = sender._meta.get_field(objects_map.generic_foreign_key.ct_field)
+                content_type_id = values.get(ct_field.attname)
+                if content_type_id is None:
+                    continue
+                model = ContentType.objects.get_for_id(content_type_id).model_class()
+                if model is None:
+                    continue
+                target_attname = model._meta.pk.attname
+            else:
+                model = objects_map.target_model
+                target_attname = objects_map.target_field.attname
+            keys.add(self.get_version_key(model, target_attname, value))
+        return keys
+
+    def _get_values(self, sender, instance):
+        values = {}
+        for objects_map in self._fields_by_model.get(sender, ()):
+            attnames = [objects_map.field.attname]
+            if objects_map.generic_foreign_key is not None:
+                attnames.append(sender._meta.get_field(objects_map.generic_foreign_key.ct_field).attname)
+            for attname in attnames:
+                # Deferred columns are left out rather than loaded.
+                if attname in instance.__dict__:
+                    values[attname] = instance.__dict__[attname]
+        return values
+
+    def _post_init(self, sender, instance, **kwargs):
+        instance.__dict__[self._initial_attr] = self._get_values(sender, instance)
+
+    def _invalidate(self, sender, instance, values):
+        keys = self._get_version_keys(sender, values)
+        keys.update(self._get_version_keys(sender, instance.__dict__.get(self._initial_attr, {})))
+        if keys:
+            self.cache.delete_many(list(keys))
+            self._count('invalidations', len(keys))
+
+    def _post_save(self, sender, instance, **kwargs):
+        values = self._get_values(sender, instance)
+        self._invalidate(sender, instance, values)
+        instance.__dict__[self._initial_attr] = values
+
+    def _post_delete(self, sender, instance, **kwargs):
+        self._invalidate(sender, instance, self._get_values(sender, instance))
+
+    def get_version_key(self, model, attname, value):
+        """
+        Returns the cache key of the version of the entries of the
+        instance of *model* whose *attname* is *value*.
+
+        :rtype: str
+        """
+        return '{}:version:{}'.format(
+            self.key_prefix,
+            _hash(model._meta.concrete_model._meta.label, attname, str(value))
+        )
+
+    def get_key(self, kind, instance, kwargs):
+        """
+        Returns the cache key of the *kind* of lookup of *instance* with
+        the filters *kwargs*, for the current versions of *instance*.
+
+        :rtype: str
+        """
+        model = instance._meta.concrete_model
+        if self._models is not None and model not in self._models:
+            raise ValueError('{} is not one of the models of the cache.'.format(model._meta.label))
+
+        version_keys = [
+            self.get_version_key(model, attname, getattr(instance, attname))
+            for attname in self.watch(type(instance))
+        ]
+        versions = self.cache.get_many(version_keys)
+        for version_key in version_keys:
+            if version_key not in versions:
+                self.cache.add(version_key, uuid.uuid4().hex, None)
+                versions[version_key] = self.cache.get(version_key)
+
+        return '{}:{}:{}'.format(
+            self.key_prefix,
+            kind,
+            _hash(
+                model._meta.label,
+                str(instance.pk),
+                [versions[version_key] for version_key in version_keys],
+                sorted((key, repr(value)) for key, value in kwargs.items()),
+            )
+        )
+
+    def _get(self, kind, func, instance, kwargs):
+        if 'related_models' in kwargs:
+            raise ValueError('The related models of a cache are given when it is created.')
+
+        key = self.get_key(kind, instance, kwargs)
+        entry = self.cache.get(key)
+        if entry is not None:
+            self._count('hits')
+            return {get_field_by_label(label): values for label, values in entry}
+
+        self._count('misses')
+        result = func(instance, related_models=self.related_models, **kwargs)
+        self.cache.set(
+            key,
+            [(get_field_label(field), values) for field, values in result.items()],
+            self.timeout
+        )
+        return result
+
+    def get_related_objects(self, instance, **kwargs):
+        """
+        Cached version of
+        :func:`~django_related_models.related_models.get_related_objects`,
+        which stores the related instances.
+
+        :rtype: Dict[Field, List[Object]]
+        """
+        return self._get('objects', get_related_objects, instance, kwargs)
+
+    def get_related_pks(self, instance, **kwargs):
+        """
+        Cached version of
+        :func:`~django_related_models.related_models.get_related_pks`,
+        which stores only the primary keys.
+
+        :rtype: Dict[Field, List[Any]]
+        """
+        return self._get('pks', get_related_pks, instance, kwargs)
@@ -0,0 +1,107 @@
+"""
+Time budgets for related object lookups.
+
+:func:`statement_timeout` makes the database itself cancel queries which
+run for too long, on the backends which allow it, and
+:class:`PartialRelatedObjects` is the result of a lookup which could not
+query every referring field in time.
+"""
+from contextlib import contextmanager
+
+from django.db import connections
+from django.db import transaction
+
+from .instrumentation import timer
+
+#: The number of SQLite virtual machine instructions between two checks of
+#: the deadline of a query.
+SQLITE_PROGRESS_INTERVAL = 1000
+
+
+@contextmanager
+def statement_timeout(using, timeout):
+    """
+    Makes the queries run on the database *using* inside of the block fail
+    with a :class:`~django.db.DatabaseError` once they have run for
+    *timeout* seconds, if it is not None:
+
+    * on PostgreSQL, with ``SET LOCAL statement_timeout`` inside of a
+      transaction (or a savepoint, inside of an existing one).  The
+      previous timeout is restored afterwards, since it would otherwise last
+      until the end of an enclosing transaction,
+    * on MySQL and MariaDB, with the ``max_execution_time`` or
+      ``max_statement_time`` of the session, which is restored afterwards.
+      MySQL only applies it to ``SELECT`` queries,
+    * on SQLite, with a progress handler interrupting the query past its
+      deadline.
+
+    Other backends are not limited.
+    """
+    connection = connections[using]
+    if timeout is None:
+        yield
+    elif connection.vendor == 'postgresql':
+        with transaction.atomic(using=using):
+            with connection.cursor() as cursor:
+                cursor.execute('SHOW statement_timeout')
+                previous = cursor.fetchone()[0]
+                cursor.execute('SET LOCAL statement_timeout = {:d}'.format(max(1, int(timeout * 1000))))
+            # Releasing a savepoint keeps the settings made inside of it, so
+            # they are restored here.  Rolling back a failed block restores
+            # them as well, and no query can run in it anymore.
+            yield
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL statement_timeout = %s', [previous])
+    elif connection.vendor == 'mysql':
+        if getattr(connection, 'mysql_is_mariadb', False):
+            variable, value = 'max_statement_time', '{:f}'.format(timeout)
+        else:
+            variable, value = 'max_execution_time', '{:d}'.format(max(1, int(timeout * 1000)))
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT @@SESSION.{}'.format(variable))
+            previous = cursor.fetchone()[0]
+            cursor.execute('SET SESSION {} = {}'.format(variable, value))
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('SET SESSION {} = %s'.format(variable), [previous])
+    elif connection.vendor == 'sqlite':
+        connection.ensure_connection()
+        deadline = timer() + timeout
+        connection.connection.set_progress_handler(lambda: timer() >= deadline, SQLITE_PROGRESS_INTERVAL)
+        try:
+            yield
+        finally:
+            connection.connection.set_progress_handler(None, 0)
+    else:
+        yield
+
+
+class PartialRelatedObjects(dict):
+    """
+    The related objects of an instance, by field, like the result of
+    :func:`~django_related_models.related_models.get_related_objects`,
+    along with the fields whose rows are missing from it: the
+    *timed_out* fields, whose query was cancelled, and the *skipped* ones,
+    which were not queried because the time budget was spent.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(PartialRelatedObjects, self).__init__(*args, **kwargs)
+        self.timed_out = []
+        self.skipped = []
+
+    @property
+    def complete(self):
+        """
+        Whether the rows of every field were looked up.
+
+        :rtype: bool
+        """
+        return not (self.timed_out or self.skipped)
+
+    def __repr__(self):
+        return '<{}: {} fields, {} timed out, {} skipped>'.format(
+            type(self).__name__, len(self), len(self.timed_out), len(self.skipped)
+        )
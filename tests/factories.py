@@ -4,6 +4,7 @@ import factory
 from tests.test_app_1.models import MockPerson
 from tests.test_app_1.models import MockPersonLocation
 from tests.test_app_1.models import MockPet
+from tests.test_app_1.models import MockPetSitting
 from tests.test_app_2.models import MockTaggedItem
 
 
@@ -32,6 +33,11 @@ class PersonLocationFactory(factory.DjangoModelFactory):
     owner = factory.SubFactory(PersonFactory)
 
 
+class PetSittingFactory(factory.DjangoModelFactory):
+    class Meta:
+        model = MockPetSitting
+
+
 class TaggedItemFactory(factory.DjangoModelFactory):
     class Meta:
         model = MockTaggedItem
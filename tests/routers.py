@@ -0,0 +1,23 @@
+class ShardRouter(object):
+    """
+    Spreads the models of ``test_app_1`` over the ``default`` and
+    ``shard`` databases.  A ``shard`` hint limits them to one of them.
+    """
+
+    def allow_migrate(self, db, app_label, model_name=None, shard=None, **hints):
+        if app_label != 'test_app_1':
+            return db == 'default'
+        return shard is None or db == shard
+
+
+class GenericShardRouter(ShardRouter):
+    """
+    Also spreads the models of ``test_app_2``, which hold generic foreign
+    keys, over both databases, while the content types stay on
+    ``default``.
+    """
+
+    def allow_migrate(self, db, app_label, model_name=None, shard=None, **hints):
+        if app_label == 'test_app_2':
+            return shard is None or db == shard
+        return super(GenericShardRouter, self).allow_migrate(db, app_label, model_name, shard=shard, **hints)
@@ -5,6 +5,7 @@ SECRET_KEY = 'roverdotcom'
 INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.auth',
+    'django_related_models',
     'tests',
     'tests.test_app_1',
     'tests.test_app_2',
@@ -21,12 +22,24 @@ if TEST_DATABASE == 'mysql':
             'PASSWORD': '',
             'HOST': '127.0.0.1',
             'PORT': 3306,
-        }
+        },
+        'shard': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': 'testdb_shard',
+            'USER': 'root',
+            'PASSWORD': '',
+            'HOST': '127.0.0.1',
+            'PORT': 3306,
+        },
     }
 else:
     DATABASES = {
             'default': {
                 'ENGINE': 'django.db.backends.sqlite3',
                 'NAME': 'woofwoof',
-            }
+            },
+            'shard': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': 'woofwoof_shard',
+            },
     }
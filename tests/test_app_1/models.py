@@ -1,9 +1,11 @@
+from django.contrib.contenttypes.fields import GenericRelation
 from django.db import models
 
 
 class MockPerson(models.Model):
     first_name = models.CharField(max_length=30)
     last_name = models.CharField(max_length=30)
+    tags = GenericRelation('test_app_2.MockTaggedItem')
 
 
 class MockPet(models.Model):
@@ -19,3 +21,12 @@ class MockPersonLocation(models.Model):
     owner = models.ForeignKey(
         MockPerson, related_name="owned_locations", on_delete=models.CASCADE, db_constraint=False
     )
+
+
+class MockPetSitting(models.Model):
+    owner = models.ForeignKey(
+        MockPerson, related_name="pet_sittings", on_delete=models.CASCADE, null=True
+    )
+    sitter = models.ForeignKey(
+        MockPerson, related_name="sittings", on_delete=models.CASCADE, null=True
+    )
@@ -0,0 +1,91 @@
+import threading
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.test import TestCase
+from django.test import TransactionTestCase
+from tests.factories import PersonFactory
+from tests.factories import PetFactory
+from tests.factories import TaggedItemFactory
+from tests.test_app_1.models import MockPet
+from tests.test_app_2.models import MockTaggedItem
+
+from django_related_models.async_related_models import _get_querysets
+from django_related_models.async_related_models import aget_related_counts
+from django_related_models.async_related_models import aget_related_objects
+from django_related_models.async_related_models import ahas_related_objects
+from django_related_models.instrumentation import StatsCollector
+from django_related_models.instrumentation import observe
+from django_related_models.related_models import get_related_counts
+from django_related_models.related_models import get_related_objects
+
+
+class AsyncRelatedModelsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super(AsyncRelatedModelsTests, cls).setUpTestData()
+        cls.person = PersonFactory.create()
+        cls.pets = PetFactory.create_batch(3, owner=cls.person)
+        cls.tagged_item = TaggedItemFactory.create(tag='dog-person', content_object=cls.person)
+        cls.unrelated_person = PersonFactory.create()
+
+    async def test_aget_related_objects(self):
+        related_objects = await aget_related_objects(self.person, concurrency=2)
+        self.assertEqual(related_objects[MockPet.owner.field], self.pets)
+        self.assertEqual(related_objects[MockTaggedItem.content_object], [self.tagged_item])
+
+    async def test_aget_related_objects_matches_get_related_objects(self):
+        self.assertEqual(
+            await aget_related_objects(self.person),
+            await sync_to_async(get_related_objects)(self.person)
+        )
+
+    async def test_aget_related_objects_extra_kwargs(self):
+        related_objects = await aget_related_objects(self.person, pk=self.pets[0].pk)
+        self.assertEqual(related_objects[MockPet.owner.field], [self.pets[0]])
+
+    async def test_aget_related_counts(self):
+        related_counts = await aget_related_counts(self.person)
+        self.assertEqual(related_counts[MockPet.owner.field], 3)
+        self.assertEqual(related_counts, await sync_to_async(get_related_counts)(self.person))
+
+    async def test_ahas_related_objects(self):
+        self.assertTrue(await ahas_related_objects(self.person))
+        self.assertFalse(await ahas_related_objects(self.unrelated_person))
+
+    async def test_observers(self):
+        with observe(StatsCollector()) as collector:
+            await aget_related_objects(self.person)
+            await aget_related_counts(self.person)
+        self.assertEqual(collector.get_stats()['queries']['test_app_1.MockPet.owner']['queries'], 2)
+        self.assertEqual(collector.get_stats()['queries']['test_app_1.MockPet.owner']['rows'], 6)
+
+
+class ConcurrentAsyncRelatedModelsTests(TransactionTestCase):
+    def setUp(self):
+        super(ConcurrentAsyncRelatedModelsTests, self).setUp()
+        self.person = PersonFactory.create()
+        self.pets = PetFactory.create_batch(3, owner=self.person)
+        TaggedItemFactory.create(tag='dog-person', content_object=self.person)
+
+    def test_get_querysets(self):
+        self.assertTrue(_get_querysets(self.person)[1])
+        with transaction.atomic():
+            self.assertFalse(_get_querysets(self.person)[1])
+
+    async def test_aget_related_objects(self):
+        threads = set()
+
+        def record_thread(**kwargs):
+            threads.add(threading.current_thread())
+
+        connection_created.connect(record_thread)
+        try:
+            related_objects = await aget_related_objects(self.person)
+        finally:
+            connection_created.disconnect(record_thread)
+
+        self.assertEqual(related_objects, await sync_to_async(get_related_objects)(self.person))
+        self.assertTrue(threads)
+        self.assertNotIn(threading.main_thread(), threads)
@@ -0,0 +1,97 @@
+from array import array
+from itertools import islice
+
+from django.test import TestCase
+from tests.factories import PersonFactory
+from tests.factories import PetFactory
+from tests.factories import PetSittingFactory
+from tests.factories import TaggedItemFactory
+from tests.test_app_1.models import MockPet
+from tests.test_app_1.models import MockPetSitting
+from tests.test_app_2.models import MockTaggedItem
+
+from django_related_models.compact import TYPECODE
+from django_related_models.compact import CompactRelatedObjects
+from django_related_models.compact import pack_pks
+from django_related_models.related_models import get_compact_related_objects
+from django_related_models.related_models import get_related_objects
+
+
+class PackPksTests(TestCase):
+    def test_integers(self):
+        self.assertEqual(pack_pks([1, 2, 5]), array(TYPECODE, [1, 2, 5]))
+
+    def test_unsorted(self):
+        self.assertEqual(pack_pks([5, 1, 2, 1]), array(TYPECODE, [1, 2, 5]))
+
+    def test_other_types(self):
+        self.assertEqual(pack_pks(['b', 'a'], integer=False), ('a', 'b'))
+
+
+class CompactRelatedObjectsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super(CompactRelatedObjectsTests, cls).setUpTestData()
+        cls.person = PersonFactory.create()
+        cls.other_person = PersonFactory.create()
+        cls.pets = PetFactory.create_batch(3, owner=cls.person)
+        cls.tagged_item = TaggedItemFactory.create(tag='dog-person', content_object=cls.person)
+        cls.shared_sitting = PetSittingFactory.create(owner=cls.person, sitter=cls.other_person)
+        cls.sitting = PetSittingFactory.create(owner=cls.person)
+
+    def test_get_compact_related_objects(self):
+        result = get_compact_related_objects(self.person, chunk_size=2)
+        self.assertEqual(len(result), 6)
+        self.assertEqual(result[MockPet.owner.field], array(TYPECODE, [pet.pk for pet in self.pets]))
+        self.assertEqual(list(result[MockTaggedItem.content_object]), [self.tagged_item.pk])
+        self.assertEqual(result.get_model(MockTaggedItem.content_object), MockTaggedItem)
+        self.assertNotIn(MockPetSitting.sitter.field, result)
+
+    def test_matches_get_related_objects(self):
+        self.assertEqual(
+            {
+                field: list(pks)
+                for field, pks in get_compact_related_objects(self.person).items()
+            },
+            {
+                field: [obj.pk for obj in objs]
+                for field, objs in get_related_objects(self.person).items()
+            }
+        )
+
+    def test_len_does_not_load_rows(self):
+        result = get_compact_related_objects(self.person)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(result), 6)
+
+    def test_iter_objects(self):
+        result = get_compact_related_objects(self.person)
+        with self.assertNumQueries(2):
+            chunks = list(islice(result.iter_objects(chunk_size=2, chunked=True), 2))
+        self.assertEqual(chunks, [
+            (MockPet.owner.field, self.pets[:2]),
+            (MockPet.owner.field, self.pets[2:]),
+        ])
+        self.assertEqual(
+            [obj for key, obj in result.iter_objects() if key == MockPet.owner.field],
+            self.pets
+        )
+
+    def test_set_operations(self):
+        result = get_compact_related_objects(self.person)
+        pets = CompactRelatedObjects()
+        pets.add(MockPet.owner.field, MockPet, [self.pets[0].pk])
+
+        self.assertEqual(list((result & pets).items()), [(MockPet.owner.field, array(TYPECODE, [self.pets[0].pk]))])
+        self.assertEqual(len(result - pets), 5)
+        self.assertEqual((result - pets)[MockPet.owner.field], array(TYPECODE, [pet.pk for pet in self.pets[1:]]))
+        self.assertEqual(result | pets, result)
+        self.assertFalse(pets - result)
+
+    def test_by_model(self):
+        by_model = (
+            get_compact_related_objects(self.person).by_model() &
+            get_compact_related_objects(self.other_person).by_model()
+        )
+        self.assertEqual(list(by_model.items()), [(MockPetSitting, array(TYPECODE, [self.shared_sitting.pk]))])
+        self.assertEqual(by_model.get_model(MockPetSitting), MockPetSitting)
@@ -0,0 +1,122 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.test import override_settings
+from tests.test_app_1.models import MockPerson
+from tests.test_app_1.models import MockPet
+
+from django_related_models.compiled_graph import get_schema_fingerprint
+from django_related_models.compiled_graph import load_model_relations
+from django_related_models.related_models import RelatedModels
+from django_related_models.related_models import clear_relation_graph_cache
+
+try:
+    from StringIO import StringIO
+except ImportError:  # Python 3
+    from io import StringIO
+
+
+class ScanCountingRelatedModels(RelatedModels):
+    scan_count = 0
+
+    def scan_model_relations(self):
+        ScanCountingRelatedModels.scan_count += 1
+        return super(ScanCountingRelatedModels, self).scan_model_relations()
+
+
+class FieldFilteringRelatedModels(ScanCountingRelatedModels):
+    def should_include_field(self, field, model):
+        return super(FieldFilteringRelatedModels, self).should_include_field(field, model)
+
+
+class CompiledGraphTests(TestCase):
+    def setUp(self):
+        super(CompiledGraphTests, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'relation_graph.json')
+        ScanCountingRelatedModels.scan_count = 0
+        clear_relation_graph_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        clear_relation_graph_cache()
+        super(CompiledGraphTests, self).tearDown()
+
+    def compile(self, **options):
+        stdout = StringIO()
+        call_command('compile_relation_graph', stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_compile_relation_graph(self):
+        self.assertIn(self.path, self.compile(output=self.path))
+        with open(self.path) as graph_file:
+            data = json.load(graph_file)
+        self.assertEqual(data['fingerprint'], get_schema_fingerprint())
+        self.assertIn(
+            ['test_app_1.MockPet', [['owner', 'test_app_1.MockPerson', 'id']], []],
+            data['models']
+        )
+        self.assertIn(
+            ['test_app_2.MockTaggedItem', [['content_type', 'contenttypes.ContentType', 'id']], ['content_object']],
+            data['models']
+        )
+
+    def test_compile_relation_graph_requires_a_path(self):
+        with self.assertRaises(CommandError):
+            self.compile()
+
+    def test_load_model_relations(self):
+        self.compile(output=self.path)
+        self.assertEqual(load_model_relations(self.path), RelatedModels().scan_model_relations())
+
+    def test_compiled_graph_is_used(self):
+        with override_settings(RELATED_MODELS_GRAPH_FILE=self.path):
+            self.compile()
+            clear_relation_graph_cache()
+            graph = ScanCountingRelatedModels().get_relation_graph()
+        self.assertEqual(ScanCountingRelatedModels.scan_count, 0)
+
+        scanned_graph = ScanCountingRelatedModels().build_relation_graph()
+        self.assertEqual(ScanCountingRelatedModels.scan_count, 1)
+        self.assertEqual(graph.models, scanned_graph.models)
+        self.assertEqual(graph.referring_fields, scanned_graph.referring_fields)
+        self.assertEqual(graph.generic_fields, scanned_graph.generic_fields)
+
+    def test_compiled_graph_is_filtered(self):
+        self.compile(output=self.path)
+        with override_settings(RELATED_MODELS_GRAPH_FILE=self.path):
+            referring_models = ScanCountingRelatedModels(exclude=[MockPet]).get_referring_models(MockPerson)
+        self.assertEqual(ScanCountingRelatedModels.scan_count, 0)
+        self.assertNotIn(MockPet, referring_models)
+
+    def test_stale_file_is_ignored(self):
+        self.compile(output=self.path)
+        with open(self.path) as graph_file:
+            data = json.load(graph_file)
+        data['fingerprint'] = 'stale'
+        with open(self.path, 'w') as graph_file:
+            json.dump(data, graph_file)
+        os.utime(self.path, (0, 0))
+
+        self.assertIsNone(load_model_relations(self.path))
+        with override_settings(RELATED_MODELS_GRAPH_FILE=self.path):
+            referring_models = ScanCountingRelatedModels().get_referring_models(MockPerson)
+        self.assertEqual(ScanCountingRelatedModels.scan_count, 1)
+        self.assertEqual(referring_models[MockPet], [MockPet._meta.get_field('owner')])
+
+    def test_missing_file_is_ignored(self):
+        self.assertIsNone(load_model_relations(self.path))
+        with override_settings(RELATED_MODELS_GRAPH_FILE=self.path):
+            ScanCountingRelatedModels().get_relation_graph()
+        self.assertEqual(ScanCountingRelatedModels.scan_count, 1)
+
+    def test_overridden_should_include_field_scans(self):
+        self.compile(output=self.path)
+        with override_settings(RELATED_MODELS_GRAPH_FILE=self.path):
+            FieldFilteringRelatedModels().get_relation_graph()
+        self.assertEqual(ScanCountingRelatedModels.scan_count, 1)
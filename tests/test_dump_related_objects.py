@@ -0,0 +1,101 @@
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from tests.factories import PersonFactory
+from tests.factories import PetFactory
+from tests.factories import TaggedItemFactory
+
+try:
+    from StringIO import StringIO
+except ImportError:  # Python 3
+    from io import StringIO
+
+
+class DumpRelatedObjectsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super(DumpRelatedObjectsTests, cls).setUpTestData()
+        cls.person = PersonFactory.create()
+        cls.pets = PetFactory.create_batch(3, owner=cls.person)
+        cls.tagged_item = TaggedItemFactory.create(tag='dog-person', content_object=cls.person)
+        PetFactory.create()
+
+    def setUp(self):
+        super(DumpRelatedObjectsTests, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'related.ndjson')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(DumpRelatedObjectsTests, self).tearDown()
+
+    def dump(self, *args, **options):
+        stderr = StringIO()
+        options.setdefault('output', self.path)
+        call_command('dump_related_objects', 'test_app_1.MockPerson', str(self.person.pk),
+                     *args, stderr=stderr, **options)
+        return stderr.getvalue()
+
+    def read(self, open_file=open):
+        with open_file(self.path, 'rb') as dump_file:
+            return [json.loads(line.decode('utf-8')) for line in dump_file]
+
+    def test_dump_related_objects(self):
+        summary = self.dump(chunk_size=2)
+        rows = self.read()
+        self.assertEqual(
+            sorted((row['model'], row['pk']) for row in rows),
+            sorted(
+                [('test_app_1.mockpet', pet.pk) for pet in self.pets] +
+                [('test_app_2.mocktaggeditem', self.tagged_item.pk)]
+            )
+        )
+        pet = next(row for row in rows if row['pk'] == self.pets[0].pk and row['model'] == 'test_app_1.mockpet')
+        self.assertEqual(pet['field'], 'owner')
+        self.assertEqual(pet['fields'], {'name': self.pets[0].name, 'owner': self.person.pk})
+        self.assertIn('test_app_1.MockPet.owner: 3', summary)
+        self.assertIn('Dumped 4 objects from 2 fields', summary)
+
+    def test_gzip(self):
+        self.dump(gzip=True)
+        self.assertEqual(len(self.read(gzip.open)), 4)
+
+    def test_stdout(self):
+        stdout = StringIO()
+        self.dump(output=None, stdout=stdout)
+        self.assertEqual(len([json.loads(line) for line in stdout.getvalue().splitlines()]), 4)
+
+    def test_stdout_gzip(self):
+        stdout = io.TextIOWrapper(io.BytesIO())
+        self.dump(output=None, stdout=stdout, gzip=True)
+        data = gzip.GzipFile(fileobj=io.BytesIO(stdout.buffer.getvalue())).read()
+        self.assertEqual(len(data.decode('utf-8').splitlines()), 4)
+
+        with self.assertRaises(CommandError):
+            self.dump(output=None, stdout=StringIO(), gzip=True)
+
+    def test_include_apps(self):
+        self.dump(include_apps=['test_app_2'])
+        self.assertEqual([row['model'] for row in self.read()], ['test_app_2.mocktaggeditem'])
+
+    def test_exclude_apps(self):
+        self.dump(exclude_apps=['test_app_2'])
+        self.assertEqual(set(row['model'] for row in self.read()), {'test_app_1.mockpet'})
+
+    def test_quiet(self):
+        self.assertEqual(self.dump(verbosity=0), '')
+
+    def test_unknown_model(self):
+        with self.assertRaises(CommandError):
+            call_command('dump_related_objects', 'test_app_1.MockUnknown', '1', output=self.path)
+
+    def test_unknown_pk(self):
+        with self.assertRaises(CommandError):
+            call_command('dump_related_objects', 'test_app_1.MockPerson', '0', output=self.path)
@@ -0,0 +1,35 @@
+from django.test import TestCase
+from tests.factories import PetFactory
+from tests.test_app_1.models import MockPet
+
+from django_related_models.estimates import AT_LEAST
+from django_related_models.estimates import ESTIMATED
+from django_related_models.estimates import EXACT
+from django_related_models.estimates import RelatedCount
+from django_related_models.estimates import estimate_rows
+from django_related_models.estimates import get_estimated_count
+
+
+class RelatedCountTests(TestCase):
+    def test_str(self):
+        self.assertEqual(str(RelatedCount(3, EXACT)), '3')
+        self.assertEqual(str(RelatedCount(3000, ESTIMATED)), '~3000')
+        self.assertEqual(str(RelatedCount(1001, AT_LEAST)), '>=1001')
+
+
+class GetEstimatedCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super(GetEstimatedCountTests, cls).setUpTestData()
+        PetFactory.create_batch(3)
+
+    def test_get_estimated_count(self):
+        self.assertEqual(get_estimated_count(MockPet.objects.all()), (3, EXACT))
+        self.assertEqual(get_estimated_count(MockPet.objects.all(), limit=3), (3, EXACT))
+        self.assertEqual(get_estimated_count(MockPet.objects.none(), limit=3), (0, EXACT))
+
+    def test_get_estimated_count_past_limit(self):
+        # SQLite has no row estimates, so only the capped count is known.
+        self.assertIsNone(estimate_rows(MockPet.objects.all()))
+        with self.assertNumQueries(1):
+            self.assertEqual(get_estimated_count(MockPet.objects.all(), limit=1), (2, AT_LEAST))
@@ -0,0 +1,107 @@
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from tests.factories import PersonFactory
+from tests.factories import PetFactory
+from tests.test_app_1.models import MockPerson
+from tests.test_app_1.models import MockPet
+from tests.test_app_2.models import MockTaggedItem
+
+from django_related_models.index_audit import INDEXED
+from django_related_models.index_audit import MISSING
+from django_related_models.index_audit import NON_LEADING
+from django_related_models.index_audit import PARTIAL
+from django_related_models.index_audit import audit_indexes
+from django_related_models.index_audit import get_index_status
+from django_related_models.related_models import GenericForeignKeyCache
+from django_related_models.related_models import RelatedModels
+
+try:
+    from StringIO import StringIO
+except ImportError:  # Python 3
+    from io import StringIO
+
+
+class GetIndexStatusTests(TestCase):
+    def test_get_index_status(self):
+        constraints = {
+            'pk': {'columns': ['id'], 'primary_key': True, 'unique': True, 'index': False},
+            'check': {'columns': ['object_id'], 'check': True, 'index': False},
+            'ct': {'columns': ['content_type_id'], 'index': True},
+            'tag': {'columns': ['tag', 'object_id'], 'index': True},
+            'both': {'columns': ['object_id', 'content_type_id', 'tag'], 'index': True},
+        }
+        self.assertEqual(get_index_status(['content_type_id', 'object_id'], constraints), (INDEXED, 'both'))
+        del constraints['both']
+        self.assertEqual(get_index_status(['content_type_id', 'object_id'], constraints), (PARTIAL, 'ct'))
+        self.assertEqual(get_index_status(['object_id'], constraints), (NON_LEADING, 'tag'))
+        self.assertEqual(get_index_status(['owner_id'], constraints), (MISSING, None))
+        self.assertEqual(get_index_status(['id'], constraints), (INDEXED, 'pk'))
+
+
+class AuditIndexesTests(TestCase):
+    def get_audits(self, **kwargs):
+        return {audit.field: audit for audit in audit_indexes(MockPerson, **kwargs)}
+
+    def test_audit_indexes(self):
+        audits = self.get_audits()
+
+        pet_audit = audits[MockPet._meta.get_field('owner')]
+        self.assertEqual(pet_audit.table, MockPet._meta.db_table)
+        self.assertEqual(pet_audit.columns, ['owner_id'])
+        self.assertEqual(pet_audit.status, INDEXED)
+        self.assertIsNotNone(pet_audit.index)
+        self.assertIsNone(pet_audit.suggestion)
+        self.assertIsNone(pet_audit.plan)
+
+        tagged_item_audit = audits[MockTaggedItem._meta.get_field('content_object')]
+        self.assertEqual(tagged_item_audit.columns, ['content_type_id', 'object_id'])
+        self.assertEqual(tagged_item_audit.status, PARTIAL)
+        self.assertEqual(
+            tagged_item_audit.suggestion,
+            "test_app_2.MockTaggedItem: models.Index(fields=['content_type', 'object_id'])"
+        )
+
+    def test_audit_indexes_unused_generic_foreign_key(self):
+        # No rows point to the model yet, which would prune the generic foreign key from lookups.
+        related_models = RelatedModels(generic_foreign_key_cache=GenericForeignKeyCache())
+        audits = self.get_audits(related_models=related_models)
+        self.assertIn(MockTaggedItem._meta.get_field('content_object'), audits)
+
+    def test_audit_indexes_explain(self):
+        related_models = RelatedModels(include=[MockPet])
+        MockPerson.objects.all().delete()
+        self.assertEqual([audit.plan for audit in audit_indexes(MockPerson, related_models, explain=True)], [None])
+
+        PetFactory.create(owner=PersonFactory.create())
+        audits = audit_indexes(MockPerson, related_models, explain=True)
+        self.assertEqual(len(audits), 1)
+        self.assertTrue(audits[0].plan)
+
+
+class AuditRelatedIndexesCommandTests(TestCase):
+    def audit(self, *args, **options):
+        stdout = StringIO()
+        stderr = StringIO()
+        call_command('audit_related_indexes', *args, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_audit_related_indexes(self):
+        output, summary = self.audit('test_app_1.MockPerson')
+        self.assertIn('test_app_1.MockPet.owner (test_app_1_mockpet.owner_id): indexed', output)
+        self.assertIn(
+            'test_app_2.MockTaggedItem.content_object (test_app_2_mocktaggeditem.content_type_id, object_id): partial',
+            output
+        )
+        self.assertIn("suggested index: test_app_2.MockTaggedItem: models.Index(fields=['content_type', 'object_id'])",
+                      output)
+        self.assertIn('lookups are not fully indexed.', summary)
+
+    def test_audit_related_indexes_exclude_app(self):
+        output, _ = self.audit('test_app_1.MockPerson', exclude_apps=['test_app_2'])
+        self.assertNotIn('MockTaggedItem', output)
+        self.assertIn('MockPet.owner', output)
+
+    def test_audit_related_indexes_unknown_model(self):
+        with self.assertRaises(CommandError):
+            self.audit('test_app_1.MockUnknown')
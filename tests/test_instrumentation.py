@@ -0,0 +1,162 @@
+from django.test import TestCase
+from tests.factories import PersonFactory
+from tests.factories import PetFactory
+from tests.factories import PetSittingFactory
+from tests.factories import TaggedItemFactory
+from tests.test_app_1.models import MockPerson
+from tests.test_app_1.models import MockPet
+from tests.test_app_1.models import MockPetSitting
+
+from django_related_models import instrumentation
+from django_related_models.instrumentation import Observer
+from django_related_models.instrumentation import StatsCollector
+from django_related_models.instrumentation import add_observer
+from django_related_models.instrumentation import observe
+from django_related_models.instrumentation import remove_observer
+from django_related_models.related_models import GenericForeignKeyCache
+from django_related_models.related_models import RelatedModels
+from django_related_models.related_models import clear_relation_graph_cache
+from django_related_models.related_models import get_related_counts
+from django_related_models.related_models import get_related_objects
+from django_related_models.related_models import get_related_pks
+from django_related_models.related_models import has_related_objects
+from django_related_models.related_models import iter_related_objects
+
+
+class RecordingObserver(Observer):
+    def __init__(self):
+        self.events = []
+
+    def graph_built(self, key, duration, graph):
+        self.events.append(('graph_built', key))
+
+    def query_executed(self, field, sql, duration, rows):
+        self.events.append(('query_executed', field, rows))
+
+
+class ObserverTests(TestCase):
+    def test_add_and_remove_observer(self):
+        observer = RecordingObserver()
+        add_observer(observer)
+        try:
+            get_related_objects(PersonFactory.create())
+        finally:
+            remove_observer(observer)
+        self.assertTrue(observer.events)
+
+        observer.events = []
+        get_related_objects(PersonFactory.create())
+        self.assertEqual(observer.events, [])
+
+    def test_observe(self):
+        with observe(RecordingObserver()) as observer:
+            self.assertIn(observer, instrumentation.observers)
+        self.assertNotIn(observer, instrumentation.observers)
+
+    def test_nothing_is_timed_without_observers(self):
+        person = PersonFactory.create()
+        PetSittingFactory.create(owner=person)
+        calls = []
+        timer = instrumentation.timer
+
+        def counting_timer():
+            calls.append(None)
+            return timer()
+
+        instrumentation.timer = counting_timer
+        try:
+            clear_relation_graph_cache()
+            get_related_objects(person)
+            get_related_pks(person)
+            get_related_counts(person, group_by_model=True)
+            list(iter_related_objects(person))
+        finally:
+            instrumentation.timer = timer
+        self.assertEqual(calls, [])
+
+    def test_base_observer_ignores_events(self):
+        with observe(Observer()):
+            get_related_objects(PersonFactory.create())
+
+
+class StatsCollectorTests(TestCase):
+    def setUp(self):
+        super(StatsCollectorTests, self).setUp()
+        self.person = PersonFactory.create()
+        self.pets = PetFactory.create_batch(3, owner=self.person)
+        self.collector = StatsCollector()
+
+    def get_query_stats(self, label):
+        return self.collector.get_stats()['queries'][label]
+
+    def test_get_related_objects(self):
+        with observe(self.collector):
+            get_related_objects(self.person)
+
+        stats = self.get_query_stats('test_app_1.MockPet.owner')
+        self.assertEqual(stats['queries'], 1)
+        self.assertEqual(stats['rows'], 3)
+        self.assertGreaterEqual(stats['max_time'], 0)
+        self.assertIn(MockPet._meta.db_table, stats['slowest_sql'])
+        self.assertEqual(self.get_query_stats('test_app_1.MockPersonLocation.owner')['rows'], 0)
+
+    def test_iter_related_objects(self):
+        with observe(self.collector):
+            related_objects = iter_related_objects(self.person, chunk_size=2)
+            next(related_objects)
+            self.assertEqual(self.collector.get_stats()['queries'], {})
+            list(related_objects)
+        self.assertEqual(self.get_query_stats('test_app_1.MockPet.owner')['rows'], 3)
+
+    def test_get_related_counts(self):
+        PetSittingFactory.create(owner=self.person, sitter=self.person)
+        with observe(self.collector):
+            get_related_counts(self.person, group_by_model=True)
+        self.assertEqual(self.get_query_stats('test_app_1.MockPet.owner')['rows'], 3)
+        self.assertEqual(self.get_query_stats('test_app_1.MockPetSitting.owner')['rows'], 1)
+        self.assertEqual(
+            self.get_query_stats('test_app_1.MockPetSitting.sitter')['slowest_sql'],
+            self.get_query_stats('test_app_1.MockPetSitting.owner')['slowest_sql']
+        )
+        self.assertIn(
+            MockPetSitting._meta.db_table,
+            self.get_query_stats('test_app_1.MockPetSitting.owner')['slowest_sql']
+        )
+
+    def test_get_related_pks(self):
+        with observe(self.collector):
+            get_related_pks(self.person)
+        self.assertEqual(self.get_query_stats('test_app_1.MockPet.owner')['rows'], 3)
+        self.assertIn('UNION ALL', self.get_query_stats('test_app_1.MockPet.owner')['slowest_sql'])
+
+    def test_has_related_objects(self):
+        with observe(self.collector):
+            has_related_objects(self.person)
+        self.assertEqual(self.get_query_stats('test_app_1.MockPet.owner')['rows'], 1)
+
+    def test_graph_built(self):
+        clear_relation_graph_cache()
+        with observe(self.collector):
+            RelatedModels().get_referring_models(MockPerson)
+            RelatedModels().get_referring_models(MockPerson)
+        self.assertEqual(self.collector.get_stats()['graph']['builds'], 1)
+
+    def test_cache_lookup(self):
+        TaggedItemFactory.create(tag='dog-person', content_object=self.person)
+        related_models = RelatedModels(generic_foreign_key_cache=GenericForeignKeyCache())
+        with observe(self.collector):
+            related_models.get_referring_models(MockPerson)
+            related_models.get_referring_models(MockPerson)
+        self.assertEqual(
+            self.collector.get_stats()['cache']['test_app_2.MockTaggedItem.content_object'],
+            {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+        )
+
+    def test_reset(self):
+        with observe(self.collector):
+            get_related_objects(self.person)
+        self.collector.reset()
+        self.assertEqual(
+            self.collector.get_stats(),
+            {'graph': {'builds': 0, 'time': 0.0}, 'queries': {}, 'cache': {}}
+        )
@@ -1,17 +1,54 @@
 import abc
 
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldError
+from django.db import connection
+from django.db import connections
+from django.db import transaction
+from django.db.models.signals import class_prepared
+from django.db.utils import ConnectionDoesNotExist
 from django.test import TestCase
+from django.test import TransactionTestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from tests.factories import PersonFactory
 from tests.factories import PersonLocationFactory
 from tests.factories import PetFactory
+from tests.factories import PetSittingFactory
 from tests.factories import TaggedItemFactory
+from tests.test_app_1.models import MockPerson
 from tests.test_app_1.models import MockPersonLocation
 from tests.test_app_1.models import MockPet
+from tests.test_app_1.models import MockPetSitting
 from tests.test_app_2.models import MockTaggedItem
 
+from django_related_models.estimates import AT_LEAST
+from django_related_models.estimates import EXACT
+from django_related_models.related_models import DEFAULT_GFK_CACHE_TIMEOUT
+from django_related_models.related_models import DELETE
+from django_related_models.related_models import NULLIFY
+from django_related_models.related_models import GenericForeignKeyCache
 from django_related_models.related_models import ModelMap
 from django_related_models.related_models import RelatedModels
+from django_related_models.related_models import RelationGraph
+from django_related_models.related_models import clear_lookup_plan_cache
+from django_related_models.related_models import clear_relation_graph_cache
+from django_related_models.related_models import default_generic_foreign_key_cache
+from django_related_models.related_models import erase_related_objects
+from django_related_models.related_models import find_related_field
+from django_related_models.related_models import get_estimated_related_counts
+from django_related_models.related_models import get_lookup_plan
+from django_related_models.related_models import get_reachable_objects
+from django_related_models.related_models import get_related_counts
 from django_related_models.related_models import get_related_objects
+from django_related_models.related_models import get_related_objects_bulk
+from django_related_models.related_models import get_related_objects_parallel
+from django_related_models.related_models import get_related_objects_sharded
+from django_related_models.related_models import get_related_pks
+from django_related_models.related_models import get_related_querysets
+from django_related_models.related_models import has_related_objects
+from django_related_models.related_models import iter_related_objects
+from django_related_models.related_models import reassign_related_objects
 
 
 class GetRelatedModelsTests(TestCase):
@@ -43,6 +80,694 @@ class GetRelatedModelsTests(TestCase):
         for tagged_item in related_objects[MockTaggedItem.content_object]:
             self.assertEqual(tagged_item.content_object.id, person.id)
 
+    def test_get_related_objects_bulk(self):
+        people = PersonFactory.create_batch(3)
+        pets = [PetFactory.create(owner=person) for person in people]
+        TaggedItemFactory.create(tag='dog-person', content_object=people[0])
+        unrelated = PersonFactory.create()
+
+        ContentType.objects.get_for_model(MockPerson)
+        referring_models = RelatedModels().get_referring_models(MockPerson)
+        with self.assertNumQueries(sum(len(fields) for fields in referring_models.values())):
+            related_objects = get_related_objects_bulk(people + [unrelated])
+
+        self.assertEqual(list(related_objects), people + [unrelated])
+        for person, pet in zip(people, pets):
+            self.assertEqual(related_objects[person][MockPet.owner.field], [pet])
+        self.assertEqual(
+            related_objects[people[0]][MockTaggedItem.content_object][0].content_object,
+            people[0]
+        )
+        self.assertNotIn(MockTaggedItem.content_object, related_objects[people[1]])
+        self.assertEqual(related_objects[unrelated], {})
+
+    def test_get_related_objects_bulk_matches_get_related_objects(self):
+        people = PersonFactory.create_batch(2)
+        PetFactory.create_batch(2, owner=people[0])
+        PersonLocationFactory.create(owner=people[1])
+        TaggedItemFactory.create(tag='dog-person', content_object=people[1])
+
+        related_objects = get_related_objects_bulk(people)
+        for person in people:
+            self.assertEqual(related_objects[person], get_related_objects(person))
+
+    def test_get_related_objects_bulk_related_models(self):
+        person = PersonFactory.create()
+        pet = PetFactory.create(owner=person)
+        PersonLocationFactory.create(owner=person)
+
+        related_objects = get_related_objects_bulk([person], related_models=RelatedModels(include=[MockPet]))
+        self.assertEqual(related_objects, {person: {MockPet.owner.field: [pet]}})
+
+    def test_iter_related_objects(self):
+        person = PersonFactory.create()
+        pets = PetFactory.create_batch(3, owner=person)
+        location = PersonLocationFactory.create(owner=person)
+        tagged_item = TaggedItemFactory.create(tag='dog-person', content_object=person)
+
+        related_objects = iter_related_objects(person, chunk_size=2)
+        self.assertFalse(isinstance(related_objects, (list, tuple)))
+        self.assertEqual(
+            sorted(list(related_objects), key=lambda item: item[1]._meta.label),
+            [(MockPersonLocation.owner.field, location)] +
+            [(MockPet.owner.field, pet) for pet in pets] +
+            [(MockTaggedItem.content_object, tagged_item)]
+        )
+
+    def test_iter_related_objects_chunked(self):
+        person = PersonFactory.create()
+        pets = PetFactory.create_batch(3, owner=person)
+
+        chunks = [
+            chunk
+            for field, chunk in iter_related_objects(person, chunk_size=2, chunked=True)
+            if field == MockPet.owner.field
+        ]
+        self.assertEqual(chunks, [pets[:2], pets[2:]])
+
+    def test_iter_related_objects_extra_kwargs(self):
+        person = PersonFactory.create()
+        pet = PetFactory.create(owner=person)
+        PetFactory.create(owner=person)
+        self.assertEqual(
+            [obj for field, obj in iter_related_objects(person, pk=pet.pk)],
+            [pet]
+        )
+
+    def test_get_related_counts(self):
+        person = PersonFactory.create()
+        PetFactory.create_batch(3, owner=person)
+        PetFactory.create()
+        TaggedItemFactory.create_batch(2, tag='dog-person', content_object=person)
+        TaggedItemFactory.create(
+            tag='dog',
+            content_type=ContentType.objects.get_for_model(MockPet),
+            object_id=person.pk
+        )
+
+        related_counts = get_related_counts(person)
+        self.assertEqual(related_counts, {
+            MockPet.owner.field: 3,
+            MockTaggedItem.content_object: 2,
+        })
+        self.assertEqual(
+            set(related_counts),
+            set(get_related_objects(person))
+        )
+
+    def test_get_related_counts_extra_kwargs(self):
+        person = PersonFactory.create()
+        pet = PetFactory.create(owner=person)
+        PetFactory.create(owner=person)
+        self.assertEqual(
+            get_related_counts(person, pk=pet.pk),
+            {MockPet.owner.field: 1}
+        )
+
+    def test_get_related_counts_related_models(self):
+        person = PersonFactory.create()
+        PetFactory.create_batch(2, owner=person)
+        TaggedItemFactory.create(tag='dog-person', content_object=person)
+        self.assertEqual(
+            get_related_counts(person, related_models=RelatedModels(exclude_apps=['test_app_2'])),
+            {MockPet.owner.field: 2}
+        )
+
+    def test_get_related_counts_group_by_model(self):
+        owner = MockPetSitting._meta.get_field('owner')
+        sitter = MockPetSitting._meta.get_field('sitter')
+        person = PersonFactory.create()
+        PetSittingFactory.create_batch(2, owner=person)
+        PetSittingFactory.create(sitter=person)
+        PetSittingFactory.create()
+
+        with CaptureQueriesContext(connection) as context:
+            related_counts = get_related_counts(person, group_by_model=True)
+        self.assertEqual(related_counts, {owner: 2, sitter: 1})
+        self.assertEqual(
+            len([
+                query for query in context.captured_queries
+                if MockPetSitting._meta.db_table in query['sql']
+            ]),
+            1
+        )
+        self.assertEqual(
+            get_related_counts(person, group_by_model=True),
+            get_related_counts(person)
+        )
+
+    def test_get_estimated_related_counts(self):
+        person = PersonFactory.create()
+        PetFactory.create_batch(3, owner=person)
+        PetFactory.create()
+        TaggedItemFactory.create(tag='dog-person', content_object=person)
+
+        related_counts = get_estimated_related_counts(person, limit=2)
+        self.assertEqual(related_counts, {
+            MockPet.owner.field: (3, AT_LEAST),
+            MockTaggedItem.content_object: (1, EXACT),
+        })
+        self.assertEqual(
+            get_estimated_related_counts(person),
+            {field: (count, EXACT) for field, count in get_related_counts(person).items()}
+        )
+
+    def test_get_estimated_related_counts_related_models(self):
+        person = PersonFactory.create()
+        PetFactory.create_batch(2, owner=person)
+        TaggedItemFactory.create(tag='dog-person', content_object=person)
+        self.assertEqual(
+            get_estimated_related_counts(person, related_models=RelatedModels(exclude_apps=['test_app_2'])),
+            {MockPet.owner.field: (2, EXACT)}
+        )
+
+    def test_has_related_objects(self):
+        person = PersonFactory.create()
+        self.assertFalse(has_related_objects(person))
+        self.assertIsNone(find_related_field(person))
+
+        TaggedItemFactory.create(tag='dog-person', content_object=person)
+        self.assertTrue(has_related_objects(person))
+        self.assertEqual(find_related_field(person), MockTaggedItem.content_object)
+
+    def test_has_related_objects_short_circuits(self):
+        person = PersonFactory.create()
+        PetFactory.create(owner=person)
+        TaggedItemFactory.create(tag='dog-person', content_object=person)
+
+        RelatedModels().get_referring_models(MockPerson)
+        with self.assertNumQueries(1):
+            self.assertEqual(find_related_field(person), MockPet.owner.field)
+
+    def test_find_related_field_related_models(self):
+        person = PersonFactory.create()
+        PetFactory.create(owner=person)
+        TaggedItemFactory.create(tag='dog-person', content_object=person)
+        self.assertEqual(
+            find_related_field(person, related_models=RelatedModels(exclude=[MockPet])),
+            MockTaggedItem.content_object
+        )
+
+        related_models = RelatedModels(
+            exclude=[MockPet],
+            generic_foreign_key_cache=GenericForeignKeyCache(use_exists=True)
+        )
+        with CaptureQueriesContext(connection) as context:
+            self.assertTrue(has_related_objects(person, related_models=related_models))
+        self.assertFalse([query for query in context.captured_queries if 'DISTINCT' in query['sql']])
+
+    def test_has_related_objects_extra_kwargs(self):
+        person = PersonFactory.create()
+        pet = PetFactory.create(owner=person)
+        self.assertTrue(has_related_objects(person, pk=pet.pk))
+        self.assertFalse(has_related_objects(person, pk=pet.pk + 1))
+
+    def test_get_related_objects_pk_only(self):
+        person = PersonFactory.create()
+        pets = PetFactory.create_batch(2, owner=person)
+        tagged_item = TaggedItemFactory.create(tag='dog-person', content_object=person)
+        self.assertEqual(get_related_objects(person, pk_only=True), {
+            MockPet.owner.field: [pet.pk for pet in pets],
+            MockTaggedItem.content_object: [tagged_item.pk],
+        })
+
+    def test_get_related_objects_fields(self):
+        person = PersonFactory.create()
+        pet = PetFactory.create(owner=person)
+        PersonLocationFactory.create(owner=person)
+        related_objects = get_related_objects(person, fields={MockPet: ['pk', 'name']})
+        self.assertEqual(related_objects[MockPet.owner.field], [(pet.pk, pet.name)])
+        self.assertIsInstance(related_objects[MockPersonLocation.owner.field][0], MockPersonLocation)
+        self.assertEqual(
+            get_related_objects(person, fields=['pk'])[MockPet.owner.field],
+            [(pet.pk,)]
+        )
+
+    def test_get_related_querysets(self):
+        person = PersonFactory.create()
+        pet = PetFactory.create(owner=person)
+        querysets = dict(get_related_querysets(person))
+        self.assertEqual(list(querysets[MockPet.owner.field]), [pet])
+        self.assertEqual(list(querysets[MockPersonLocation.owner.field]), [])
+
+
+class AttachRelatedObjectsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super(AttachRelatedObjectsTests, cls).setUpTestData()
+        cls.person = PersonFactory.create()
+        cls.pets = PetFactory.create_batch(2, owner=cls.person)
+        cls.sitter = PersonFactory.create()
+        cls.sitter_pet = PetFactory.create(owner=cls.sitter)
+        cls.sitting = PetSittingFactory.create(owner=cls.person, sitter=cls.sitter)
+        cls.tagged_item = TaggedItemFactory.create(tag='dog-person', content_object=cls.person)
+
+    def test_attach(self):
+        person = MockPerson.objects.get(pk=self.person.pk)
+        related_objects = get_related_objects(person, attach=True)
+        with self.assertNumQueries(0):
+            self.assertEqual(list(person.pets.all()), self.pets)
+            self.assertEqual(list(person.owned_locations.all()), [])
+            self.assertEqual(list(person.pet_sittings.all()), [self.sitting])
+            self.assertEqual(list(person.tags.all()), [self.tagged_item])
+            self.assertIs(related_objects[MockPet.owner.field][0].owner, person)
+
+    def test_select_related_and_prefetch_related(self):
+        person = MockPerson.objects.get(pk=self.person.pk)
+        # One query per field, and one for the pets of the sitters
+        with self.assertNumQueries(6):
+            get_related_objects(
+                person,
+                attach=True,
+                select_related={MockPetSitting: ['sitter']},
+                prefetch_related={MockPetSitting: ['sitter__pets']},
+            )
+        with self.assertNumQueries(0):
+            sitting = person.pet_sittings.all()[0]
+            self.assertEqual(sitting.sitter, self.sitter)
+            self.assertEqual(list(sitting.sitter.pets.all()), [self.sitter_pet])
+
+    def test_attach_requires_instances(self):
+        with self.assertRaises(ValueError):
+            get_related_objects(self.person, attach=True, pk_only=True)
+
+    def test_attach_requires_all_rows(self):
+        person = MockPerson.objects.get(pk=self.person.pk)
+        with self.assertRaises(ValueError):
+            get_related_objects(person, attach=True, pk=self.pets[0].pk)
+        self.assertEqual(list(person.pets.all()), self.pets)
+
+        related_models = RelatedModels(include=[MockPet])
+        get_related_objects(person, attach=True, related_models=related_models)
+        with self.assertNumQueries(0):
+            self.assertEqual(list(person.pets.all()), self.pets)
+
+    def test_get_accessor_name(self):
+        self.assertEqual(ModelMap(MockPerson, MockPet.owner.field).get_accessor_name(), 'pets')
+        self.assertEqual(
+            ModelMap(MockPerson, MockTaggedItem._meta.get_field('content_object')).get_accessor_name(),
+            'tags'
+        )
+        self.assertIsNone(
+            ModelMap(MockPet, MockTaggedItem._meta.get_field('content_object')).get_accessor_name()
+        )
+
+
+class GetRelatedPksTests(TestCase):
+    def setUp(self):
+        super(GetRelatedPksTests, self).setUp()
+        self.person = PersonFactory.create()
+        self.pets = PetFactory.create_batch(3, owner=self.person)
+        PersonLocationFactory.create(owner=self.person)
+        PetSittingFactory.create(owner=self.person, sitter=self.person)
+        TaggedItemFactory.create(tag='dog-person', content_object=self.person)
+        TaggedItemFactory.create(
+            tag='dog',
+            content_type=ContentType.objects.get_for_model(MockPet),
+            object_id=self.person.pk
+        )
+
+    def get_expected_pks(self, **kwargs):
+        return {
+            field: sorted(pks)
+            for field, pks in get_related_objects(self.person, pk_only=True, **kwargs).items()
+        }
+
+    def get_related_pks(self, **kwargs):
+        return {
+            field: sorted(pks)
+            for field, pks in get_related_pks(self.person, **kwargs).items()
+        }
+
+    def test_get_related_pks(self):
+        get_related_querysets(self.person)
+        with self.assertNumQueries(1):
+            related_pks = self.get_related_pks()
+        self.assertEqual(related_pks, self.get_expected_pks())
+        self.assertEqual(related_pks[MockPet.owner.field], [pet.pk for pet in self.pets])
+
+    def test_get_related_pks_extra_kwargs(self):
+        self.assertEqual(
+            self.get_related_pks(pk=self.pets[0].pk),
+            self.get_expected_pks(pk=self.pets[0].pk)
+        )
+
+    def test_get_related_pks_without_union(self):
+        querysets = get_related_querysets(self.person)
+        with self.assertNumQueries(len(querysets)):
+            related_pks = self.get_related_pks(union=False)
+        self.assertEqual(related_pks, self.get_expected_pks())
+
+    def test_get_related_pks_unsupported_backend(self):
+        querysets = get_related_querysets(self.person)
+        connection.features.supports_select_union = False
+        try:
+            with self.assertNumQueries(len(querysets)):
+                related_pks = self.get_related_pks()
+        finally:
+            del connection.features.supports_select_union
+        self.assertEqual(related_pks, self.get_expected_pks())
+
+
+class GetRelatedObjectsParallelTests(TransactionTestCase):
+    def setUp(self):
+        super(GetRelatedObjectsParallelTests, self).setUp()
+        self.person = PersonFactory.create()
+        self.pets = PetFactory.create_batch(3, owner=self.person)
+        PersonLocationFactory.create(owner=self.person)
+        TaggedItemFactory.create(tag='dog-person', content_object=self.person)
+
+    def test_get_related_objects_parallel(self):
+        related_objects = get_related_objects_parallel(self.person, max_workers=2)
+        self.assertEqual(related_objects[MockPet.owner.field], self.pets)
+        self.assertEqual(related_objects, get_related_objects(self.person))
+
+    def test_get_related_objects_parallel_using(self):
+        self.assertEqual(
+            get_related_objects_parallel(self.person, using=['default', 'default']),
+            get_related_objects(self.person)
+        )
+        self.assertEqual(
+            get_related_objects_parallel(self.person, using='default', pk=self.pets[0].pk),
+            get_related_objects(self.person, pk=self.pets[0].pk)
+        )
+
+    def test_get_related_objects_parallel_raises_errors(self):
+        with self.assertRaises(ConnectionDoesNotExist):
+            get_related_objects_parallel(self.person, using=['default', 'missing'])
+
+    def test_get_related_objects_parallel_no_aliases(self):
+        with self.assertRaises(ValueError):
+            get_related_objects_parallel(self.person, using=[])
+
+    def test_get_related_objects_parallel_in_transaction(self):
+        with transaction.atomic():
+            pet = PetFactory.create(owner=self.person)
+            related_objects = get_related_objects_parallel(self.person, max_workers=2)
+            self.assertEqual(related_objects[MockPet.owner.field], self.pets + [pet])
+            self.assertEqual(related_objects, get_related_objects(self.person))
+
+
+@override_settings(DATABASE_ROUTERS=['tests.routers.ShardRouter'])
+class GetRelatedObjectsShardedTests(TransactionTestCase):
+    databases = {'default', 'shard'}
+    multi_db = True
+
+    def setUp(self):
+        super(GetRelatedObjectsShardedTests, self).setUp()
+        self.person = PersonFactory.create()
+        self.pets = PetFactory.create_batch(2, owner=self.person)
+        self.shard_pets = [
+            MockPet.objects.using('shard').create(name='Shard{}'.format(i), owner_id=self.person.pk)
+            for i in range(2)
+        ]
+        self.tagged_item = TaggedItemFactory.create(tag='dog-person', content_object=self.person)
+
+    def test_get_databases(self):
+        objects_map = ModelMap(MockPerson, MockPet.owner.field)
+        self.assertEqual(objects_map.get_databases(), ['default', 'shard'])
+        self.assertEqual(objects_map.get_databases(shard='shard'), ['shard'])
+        self.assertEqual(
+            ModelMap(MockPerson, MockTaggedItem._meta.get_field('content_object')).get_databases(),
+            ['default']
+        )
+
+    @override_settings(DATABASE_ROUTERS=[])
+    def test_get_databases_without_routers(self):
+        objects_map = ModelMap(MockPerson, MockPet.owner.field)
+        self.assertEqual(objects_map.get_databases(), ['default'])
+        self.assertEqual(get_related_objects_sharded(self.person)[MockPet.owner.field], self.pets)
+
+    def test_get_databases_test_mirror(self):
+        test_settings = connections['shard'].settings_dict['TEST']
+        test_settings['MIRROR'] = 'default'
+        try:
+            self.assertEqual(ModelMap(MockPerson, MockPet.owner.field).get_databases(), ['default'])
+        finally:
+            test_settings['MIRROR'] = None
+
+    def test_get_related_objects_sharded(self):
+        related_objects = get_related_objects_sharded(self.person, max_workers=2)
+        self.assertEqual(related_objects, {
+            MockPet.owner.field: self.pets + self.shard_pets,
+            MockTaggedItem.content_object: [self.tagged_item],
+        })
+        self.assertEqual(
+            [pet._state.db for pet in related_objects[MockPet.owner.field]],
+            ['default', 'default', 'shard', 'shard']
+        )
+
+    def test_get_related_objects_sharded_hints(self):
+        related_objects = get_related_objects_sharded(self.person, hints={'shard': 'shard'})
+        self.assertEqual(related_objects[MockPet.owner.field], self.shard_pets)
+
+    def test_get_related_objects_sharded_extra_kwargs(self):
+        self.assertEqual(
+            get_related_objects_sharded(self.person, related_models=RelatedModels(include=[MockPet]), name='Shard1'),
+            {MockPet.owner.field: [self.shard_pets[1]]}
+        )
+
+    @override_settings(DATABASE_ROUTERS=['tests.routers.GenericShardRouter'])
+    def test_get_related_objects_sharded_generic_foreign_keys(self):
+        MockTaggedItem.objects.all().delete()
+        person = PersonFactory.create()
+        shard_tagged_item = MockTaggedItem.objects.using('shard').create(
+            tag='dog-person',
+            content_type=ContentType.objects.get_for_model(MockPerson),
+            object_id=person.pk
+        )
+        field = MockTaggedItem._meta.get_field('content_object')
+        self.assertEqual(ModelMap(MockPerson, field).get_databases(), ['default', 'shard'])
+
+        # Pruning on the default database would leave the generic foreign key out.
+        related_models = RelatedModels(generic_foreign_key_cache=GenericForeignKeyCache())
+        self.assertNotIn(MockTaggedItem, related_models.get_referring_models(MockPerson))
+        self.assertEqual(
+            get_related_objects_sharded(person, related_models=related_models),
+            {field: [shard_tagged_item]}
+        )
+
+
+class ReassignRelatedObjectsTests(TestCase):
+    def setUp(self):
+        super(ReassignRelatedObjectsTests, self).setUp()
+        self.source = PersonFactory.create()
+        self.target = PersonFactory.create()
+        self.pets = PetFactory.create_batch(3, owner=self.source)
+        self.target_pet = PetFactory.create(owner=self.target)
+        self.tagged_item = TaggedItemFactory.create(tag='dog-person', content_object=self.source)
+        self.pet_tagged_item = TaggedItemFactory.create(
+            tag='dog',
+            content_type=ContentType.objects.get_for_model(MockPet),
+            object_id=self.source.pk
+        )
+
+    def test_reassign_related_objects(self):
+        counts = reassign_related_objects(self.source, self.target)
+        self.assertEqual(counts, {
+            MockPet.owner.field: 3,
+            MockTaggedItem.content_object: 1,
+        })
+        self.assertEqual(get_related_objects(self.source), {})
+        self.assertEqual(
+            get_related_objects(self.target)[MockPet.owner.field],
+            self.pets + [self.target_pet]
+        )
+        self.tagged_item.refresh_from_db()
+        self.assertEqual(self.tagged_item.content_object, self.target)
+
+        # Rows pointing to other models with the same id are left alone
+        self.pet_tagged_item.refresh_from_db()
+        self.assertEqual(self.pet_tagged_item.object_id, self.source.pk)
+
+    def test_reassign_related_objects_related_models(self):
+        counts = reassign_related_objects(
+            self.source,
+            self.target,
+            related_models=RelatedModels(include_apps=['test_app_1'])
+        )
+        self.assertEqual(counts, {MockPet.owner.field: 3})
+        self.tagged_item.refresh_from_db()
+        self.assertEqual(self.tagged_item.content_object, self.source)
+
+    def test_reassign_related_objects_batch_size(self):
+        objects_map = ModelMap(MockPerson, MockPet.owner.field)
+        with CaptureQueriesContext(connection) as context:
+            count = objects_map.reassign_related_objects(self.source, self.target, batch_size=2)
+        self.assertEqual(count, 3)
+        self.assertEqual(
+            len([query for query in context.captured_queries if query['sql'].startswith('UPDATE')]),
+            2
+        )
+        self.assertEqual(
+            reassign_related_objects(self.target, self.source, batch_size=2),
+            {MockPet.owner.field: 4}
+        )
+        self.assertEqual(len(get_related_objects(self.source)[MockPet.owner.field]), 4)
+
+    def test_reassign_related_objects_is_atomic(self):
+        # MockPet rows are updated before the filter fails on a model
+        # without a name field.
+        with self.assertRaises(FieldError):
+            reassign_related_objects(self.source, self.target, name__startswith='Buddy')
+        self.assertEqual(len(get_related_objects(self.source)[MockPet.owner.field]), 3)
+
+    def test_reassign_related_objects_different_models(self):
+        with self.assertRaises(ValueError):
+            reassign_related_objects(self.source, self.pets[0])
+
+
+class EraseRelatedObjectsTests(TestCase):
+    def setUp(self):
+        super(EraseRelatedObjectsTests, self).setUp()
+        self.person = PersonFactory.create()
+        self.pets = PetFactory.create_batch(5, owner=self.person)
+        self.other_pet = PetFactory.create()
+        self.sittings = [
+            PetSittingFactory.create(owner=self.person),
+            PetSittingFactory.create(sitter=self.person),
+        ]
+        self.tagged_item = TaggedItemFactory.create(tag='dog-person', content_object=self.person)
+
+    def test_erase_related_objects(self):
+        counts = erase_related_objects(self.person, policies={
+            MockPetSitting.owner.field: NULLIFY,
+            MockPetSitting.sitter.field: NULLIFY,
+        })
+        self.assertEqual(counts, {
+            MockPet.owner.field: 5,
+            MockPetSitting.owner.field: 1,
+            MockPetSitting.sitter.field: 1,
+            MockTaggedItem.content_object: 1,
+        })
+        self.assertEqual(get_related_objects(self.person), {})
+        self.assertEqual(list(MockPet.objects.all()), [self.other_pet])
+        self.assertEqual(MockPetSitting.objects.count(), 2)
+
+    def test_erase_related_objects_update(self):
+        counts = erase_related_objects(
+            self.person,
+            policies={MockPet.owner.field: {'name': 'anonymous'}},
+            default_policy={},
+            related_models=RelatedModels(include=[MockPet]),
+        )
+        self.assertEqual(counts, {MockPet.owner.field: 5})
+        self.assertEqual(
+            set(pet.name for pet in get_related_objects(self.person)[MockPet.owner.field]),
+            {'anonymous'}
+        )
+
+    def test_erase_related_objects_batches(self):
+        objects_map = ModelMap(MockPerson, MockPet.owner.field)
+        batches = []
+        with CaptureQueriesContext(connection) as context:
+            count = objects_map.erase_related_objects(self.person, batch_size=2, on_batch=batches.append)
+        self.assertEqual(count, 5)
+        self.assertEqual(batches, [self.pets[1].pk, self.pets[3].pk, self.pets[4].pk])
+        self.assertEqual(
+            len([query for query in context.captured_queries if query['sql'].startswith('DELETE')]),
+            3
+        )
+
+    def test_erase_related_objects_checkpoint(self):
+        checkpoints = []
+        checkpoint = {
+            'test_app_1.MockPet.owner': self.pets[2].pk,
+            'test_app_2.MockTaggedItem.content_object': None,
+        }
+        counts = erase_related_objects(
+            self.person,
+            default_policy=DELETE,
+            policies={MockPetSitting.owner.field: NULLIFY, MockPetSitting.sitter.field: NULLIFY},
+            batch_size=1,
+            checkpoint=checkpoint,
+            on_checkpoint=lambda checkpoint: checkpoints.append(dict(checkpoint)),
+        )
+        self.assertEqual(counts, {
+            MockPet.owner.field: 2,
+            MockPetSitting.owner.field: 1,
+            MockPetSitting.sitter.field: 1,
+        })
+        self.assertEqual(checkpoints[0]['test_app_1.MockPet.owner'], self.pets[3].pk)
+        self.assertEqual(set(checkpoint.values()), {None})
+        self.assertEqual(
+            get_related_objects(self.person),
+            {MockPet.owner.field: self.pets[:3], MockTaggedItem.content_object: [self.tagged_item]}
+        )
+
+    def test_erase_related_objects_not_nullable(self):
+        with self.assertRaises(ValueError):
+            erase_related_objects(self.person, default_policy=NULLIFY)
+        self.assertEqual(len(get_related_objects(self.person)), 4)
+
+
+class GetReachableObjectsTests(TestCase):
+    def setUp(self):
+        super(GetReachableObjectsTests, self).setUp()
+        self.person = PersonFactory.create()
+        self.pets = PetFactory.create_batch(3, owner=self.person)
+        self.tagged_items = [
+            TaggedItemFactory.create(tag='dog', content_object=pet)
+            for pet in self.pets
+        ]
+
+    def test_get_reachable_objects(self):
+        reachable_objects = get_reachable_objects(self.person)
+        self.assertEqual(reachable_objects[MockPet.owner.field], self.pets)
+        self.assertEqual(reachable_objects[MockTaggedItem.content_object], self.tagged_items)
+
+    def test_get_reachable_objects_max_depth(self):
+        reachable_objects = get_reachable_objects(self.person, max_depth=1)
+        self.assertEqual(reachable_objects, get_related_objects(self.person))
+        self.assertEqual(get_reachable_objects(self.person, max_depth=0), {})
+
+    def test_get_reachable_objects_related_models(self):
+        reachable_objects = get_reachable_objects(
+            self.person,
+            related_models=RelatedModels(exclude=[MockTaggedItem])
+        )
+        self.assertEqual(list(reachable_objects), [MockPet.owner.field])
+
+    def test_get_reachable_objects_batches_levels(self):
+        pet_content_type = ContentType.objects.get_for_model(MockPet)
+        with CaptureQueriesContext(connection) as context:
+            get_reachable_objects(self.person)
+
+        def count_queries(*fragments):
+            return len([
+                query for query in context.captured_queries
+                if all(fragment in query['sql'] for fragment in fragments)
+            ])
+
+        qn = connection.ops.quote_name
+        self.assertEqual(
+            count_queries('{}.{} IN ('.format(qn(MockPet._meta.db_table), qn('owner_id'))),
+            1
+        )
+        self.assertEqual(
+            count_queries(
+                '{}.{} = {}'.format(
+                    qn(MockTaggedItem._meta.db_table),
+                    qn('content_type_id'),
+                    pet_content_type.pk
+                ),
+                '{} IN ('.format(qn('object_id'))
+            ),
+            1
+        )
+
+    def test_get_reachable_objects_cycle(self):
+        tagged_item = TaggedItemFactory.create(tag='a', content_object=self.person)
+        other_tagged_item = TaggedItemFactory.create(tag='b', content_object=tagged_item)
+        tagged_item.content_object = other_tagged_item
+        tagged_item.save()
+
+        reachable_objects = get_reachable_objects(tagged_item)
+        self.assertEqual(
+            reachable_objects,
+            {MockTaggedItem.content_object: [other_tagged_item]}
+        )
+
 
 class ModelMapTestsMixin(object):
     __metaclass__ = abc.ABCMeta
@@ -92,6 +817,26 @@ class ModelMapTests(ModelMapTestsMixin, TestCase):
     def test_generic_foreign_key(self):
         self.assertIsNone(self.model_map.generic_foreign_key)
 
+    def test_get_lookup_cost(self):
+        generic_model_map = ModelMap(MockPerson, MockTaggedItem._meta.get_field('content_object'))
+        self.assertLess(self.model_map.get_lookup_cost(), generic_model_map.get_lookup_cost())
+
+    def test_get_lookup_plan(self):
+        plan = self.model_map.get_lookup_plan()
+        self.assertEqual(plan.field, self.field)
+        self.assertEqual(plan.attname, 'owner_id')
+        self.assertEqual(plan.target_attname, 'id')
+        self.assertIsNone(plan.content_type_attname)
+        self.assertEqual(plan.lookup_cost, self.model_map.get_lookup_cost())
+        self.assertEqual(list(plan.get_related_objects(self.instance)), [self.pet])
+        self.assertEqual(list(plan.get_related_objects(self.instance, pk_only=True)), [self.pet.pk])
+
+    def test_lookup_plan_is_immutable(self):
+        plan = self.model_map.get_lookup_plan()
+        with self.assertRaises(AttributeError):
+            plan.attname = 'id'
+        self.assertFalse(hasattr(plan, '__dict__'))
+
     def test_get_related_objects(self):
         new_pet = PetFactory.create(owner=self.instance)
         self.assertEqual(
@@ -106,6 +851,45 @@ class ModelMapTests(ModelMapTestsMixin, TestCase):
             [new_pet]
         )
 
+    def test_get_related_objects_pk_only(self):
+        self.assertEqual(
+            list(self.model_map.get_related_objects(self.instance, pk_only=True)),
+            [self.pet.pk]
+        )
+
+    def test_get_related_objects_fields(self):
+        self.assertEqual(
+            list(self.model_map.get_related_objects(self.instance, fields=['name'])),
+            [(self.pet.name,)]
+        )
+
+    def test_get_related_objects_bulk(self):
+        other_person = PersonFactory.create()
+        other_pet = PetFactory.create(owner=other_person)
+        self.assertEqual(
+            self.model_map.get_related_objects_bulk([self.instance, other_person]),
+            {self.instance: [self.pet], other_person: [other_pet]}
+        )
+
+    def test_get_related_objects_bulk_duplicates(self):
+        self.assertEqual(
+            self.model_map.get_related_objects_bulk([self.instance, MockPerson.objects.get(pk=self.instance.pk)]),
+            {self.instance: [self.pet]}
+        )
+
+    def test_get_related_objects_bulk_batches(self):
+        people = [self.instance] + PersonFactory.create_batch(2)
+        with self.assertNumQueries(2):
+            related_objects = self.model_map.get_related_objects_bulk(people, batch_size=2)
+        self.assertEqual(related_objects, {self.instance: [self.pet]})
+
+    def test_get_related_objects_bulk_extra_kwargs(self):
+        new_pet = PetFactory.create(owner=self.instance)
+        self.assertEqual(
+            self.model_map.get_related_objects_bulk([self.instance], pk=new_pet.pk),
+            {self.instance: [new_pet]}
+        )
+
 
 class ModelMapGenericForeignKeyTests(ModelMapTestsMixin, TestCase):
     @classmethod
@@ -136,6 +920,20 @@ class ModelMapGenericForeignKeyTests(ModelMapTestsMixin, TestCase):
     def test_generic_foreign_key(self):
         self.assertEqual(self.model_map.generic_foreign_key, self.get_field())
 
+    def test_get_lookup_plan(self):
+        TaggedItemFactory.create(
+            tag='dog',
+            content_type=ContentType.objects.get_for_model(MockPet),
+            object_id=self.instance.pk
+        )
+        plan = self.model_map.get_lookup_plan()
+        self.assertEqual(plan.field, self.get_field())
+        self.assertEqual(plan.attname, 'object_id')
+        self.assertEqual(plan.content_type_attname, 'content_type_id')
+        self.assertEqual(plan.content_type_id, ContentType.objects.get_for_model(MockPerson).id)
+        with self.assertNumQueries(1):
+            self.assertEqual(list(plan.get_related_objects(self.instance)), [self.tagged_item])
+
     def test_get_related_objects(self):
         self.assertEqual(
             list(self.model_map.get_related_objects(self.instance)),
@@ -152,6 +950,28 @@ class ModelMapGenericForeignKeyTests(ModelMapTestsMixin, TestCase):
             [tagged_item]
         )
 
+    def test_get_related_objects_bulk(self):
+        other_person = PersonFactory.create()
+        other_tagged_item = TaggedItemFactory.create(
+            tag='cat-person',
+            content_object=other_person
+        )
+        # A row with the same object id but pointing to another model
+        # must not be returned.
+        TaggedItemFactory.create(
+            tag='dog',
+            content_type=ContentType.objects.get_for_model(MockPet),
+            object_id=self.instance.pk
+        )
+
+        ContentType.objects.get_for_model(MockPerson)
+        with self.assertNumQueries(1):
+            related_objects = self.model_map.get_related_objects_bulk([self.instance, other_person])
+        self.assertEqual(
+            related_objects,
+            {self.instance: [self.tagged_item], other_person: [other_tagged_item]}
+        )
+
 
 class RelatedModelsTests(TestCase):
     def setUp(self):
@@ -176,3 +996,189 @@ class RelatedModelsTests(TestCase):
     def test_should_consider_included_app_false(self):
         rm = RelatedModels(include_apps=[MockPet._meta.app_label])
         self.assertFalse(rm.should_consider(MockTaggedItem))
+
+
+class CountingRelatedModels(RelatedModels):
+    build_count = 0
+
+    def build_relation_graph(self):
+        CountingRelatedModels.build_count += 1
+        return super(CountingRelatedModels, self).build_relation_graph()
+
+
+class RelationGraphCacheTests(TestCase):
+    def setUp(self):
+        super(RelationGraphCacheTests, self).setUp()
+        clear_relation_graph_cache()
+
+    def test_get_referring_models(self):
+        referring_models = RelatedModels().get_referring_models(MockPerson)
+        self.assertEqual(referring_models[MockPet], [MockPet._meta.get_field('owner')])
+        self.assertEqual(
+            referring_models[MockPersonLocation],
+            [MockPersonLocation._meta.get_field('owner')]
+        )
+
+    def test_graph_is_shared_between_instances(self):
+        graph = RelatedModels().get_relation_graph()
+        self.assertIsInstance(graph, RelationGraph)
+        self.assertIs(RelatedModels().get_relation_graph(), graph)
+
+    def test_graph_is_built_once(self):
+        CountingRelatedModels.build_count = 0
+        CountingRelatedModels().get_referring_models(MockPerson)
+        CountingRelatedModels().get_referring_models(MockPet)
+        self.assertEqual(CountingRelatedModels.build_count, 1)
+
+    def test_get_related_objects_uses_shared_graph(self):
+        graph = RelatedModels().get_relation_graph()
+        get_related_objects(PersonFactory.create())
+        self.assertIs(RelatedModels().get_relation_graph(), graph)
+
+    def test_graph_is_keyed_by_settings(self):
+        graph = RelatedModels().get_relation_graph()
+        excluded_graph = RelatedModels(exclude=[MockPet]).get_relation_graph()
+        self.assertIsNot(excluded_graph, graph)
+        self.assertIs(RelatedModels(exclude=[MockPet]).get_relation_graph(), excluded_graph)
+        self.assertNotIn(
+            MockPet,
+            RelatedModels(exclude=[MockPet]).get_referring_models(MockPerson)
+        )
+
+    def test_graph_is_reset_when_a_model_is_prepared(self):
+        graph = RelatedModels().get_relation_graph()
+        class_prepared.send(sender=MockPet)
+        self.assertIsNot(RelatedModels().get_relation_graph(), graph)
+
+    def test_graph_is_reset_when_installed_apps_change(self):
+        graph = RelatedModels().get_relation_graph()
+        with override_settings(INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'tests.test_app_1',
+        ]):
+            self.assertNotIn(MockTaggedItem, RelatedModels().get_referring_models(MockPerson))
+        self.assertIsNot(RelatedModels().get_relation_graph(), graph)
+
+
+class LookupPlanCacheTests(TestCase):
+    def setUp(self):
+        super(LookupPlanCacheTests, self).setUp()
+        self.field = MockPet._meta.get_field('owner')
+        clear_relation_graph_cache()
+
+    def test_plan_is_shared(self):
+        plan = get_lookup_plan(MockPerson, self.field)
+        self.assertIs(get_lookup_plan(MockPerson, self.field), plan)
+
+    def test_plan_is_reset_with_the_relation_graph(self):
+        plan = get_lookup_plan(MockPerson, self.field)
+        clear_relation_graph_cache()
+        self.assertIsNot(get_lookup_plan(MockPerson, self.field), plan)
+
+    def test_plan_is_reset_after_migrating(self):
+        plan = get_lookup_plan(MockPerson, self.field)
+        clear_lookup_plan_cache()
+        self.assertIsNot(get_lookup_plan(MockPerson, self.field), plan)
+
+
+class GenericForeignKeyCacheTests(TestCase):
+    def setUp(self):
+        super(GenericForeignKeyCacheTests, self).setUp()
+        self.field = MockTaggedItem._meta.get_field('content_object')
+        self.manager = MockTaggedItem._default_manager
+        self.person_ct = ContentType.objects.get_for_model(MockPerson)
+        self.pet_ct = ContentType.objects.get_for_model(MockPet)
+
+    def test_has_content_type(self):
+        cache = GenericForeignKeyCache()
+        TaggedItemFactory.create(tag='dog-person', content_object=PersonFactory.create())
+        with self.assertNumQueries(1):
+            self.assertTrue(cache.has_content_type(self.field, self.person_ct.id, self.manager))
+            self.assertFalse(cache.has_content_type(self.field, self.pet_ct.id, self.manager))
+
+    def test_post_save_adds_content_type(self):
+        cache = GenericForeignKeyCache()
+        self.assertFalse(cache.has_content_type(self.field, self.pet_ct.id, self.manager))
+        TaggedItemFactory.create(tag='dog', content_object=PetFactory.create())
+        with self.assertNumQueries(0):
+            self.assertTrue(cache.has_content_type(self.field, self.pet_ct.id, self.manager))
+
+    def test_post_delete_probes_content_type(self):
+        cache = GenericForeignKeyCache()
+        person = PersonFactory.create()
+        tagged_items = TaggedItemFactory.create_batch(2, tag='dog-person', content_object=person)
+        self.assertTrue(cache.has_content_type(self.field, self.person_ct.id, self.manager))
+
+        tagged_items[0].delete()
+        with self.assertNumQueries(1):
+            self.assertTrue(cache.has_content_type(self.field, self.person_ct.id, self.manager))
+
+        tagged_items[1].delete()
+        with self.assertNumQueries(1):
+            self.assertFalse(cache.has_content_type(self.field, self.person_ct.id, self.manager))
+        with self.assertNumQueries(0):
+            self.assertFalse(cache.has_content_type(self.field, self.person_ct.id, self.manager))
+
+    def test_use_exists(self):
+        cache = GenericForeignKeyCache(use_exists=True)
+        TaggedItemFactory.create(tag='dog-person', content_object=PersonFactory.create())
+        with self.assertNumQueries(2):
+            self.assertTrue(cache.has_content_type(self.field, self.person_ct.id, self.manager))
+            self.assertFalse(cache.has_content_type(self.field, self.pet_ct.id, self.manager))
+            self.assertTrue(cache.has_content_type(self.field, self.person_ct.id, self.manager))
+            self.assertFalse(cache.has_content_type(self.field, self.pet_ct.id, self.manager))
+
+    def test_timeout(self):
+        cache = GenericForeignKeyCache(timeout=0)
+        with self.assertNumQueries(2):
+            cache.has_content_type(self.field, self.person_ct.id, self.manager)
+            cache.has_content_type(self.field, self.person_ct.id, self.manager)
+
+    def test_clear(self):
+        cache = GenericForeignKeyCache()
+        cache.has_content_type(self.field, self.person_ct.id, self.manager)
+        cache.clear(self.field)
+        with self.assertNumQueries(1):
+            cache.has_content_type(self.field, self.person_ct.id, self.manager)
+
+    def test_generic_foreign_keys_are_not_pruned_by_default(self):
+        self.assertIsNone(RelatedModels().generic_foreign_key_cache)
+        person = PersonFactory.create()
+        self.assertEqual(get_related_objects(person), {})
+        self.assertEqual(RelatedModels().get_referring_models(MockPerson)[MockTaggedItem], [self.field])
+
+        # Rows written without signals are found straight away.
+        MockTaggedItem.objects.bulk_create([
+            MockTaggedItem(tag='dog-person', content_type=self.person_ct, object_id=person.pk)
+        ])
+        self.assertTrue(has_related_objects(person))
+        self.assertEqual(len(get_related_objects(person)[self.field]), 1)
+        self.assertEqual(erase_related_objects(person), {self.field: 1})
+        self.assertFalse(MockTaggedItem.objects.exists())
+
+    def test_default_cache_timeout(self):
+        self.assertEqual(default_generic_foreign_key_cache.timeout(), DEFAULT_GFK_CACHE_TIMEOUT)
+        default_generic_foreign_key_cache.clear(self.field)
+        try:
+            with override_settings(RELATED_MODELS_GFK_CACHE_TIMEOUT=0):
+                related_models = RelatedModels(generic_foreign_key_cache=default_generic_foreign_key_cache)
+                person = PersonFactory.create()
+                self.assertNotIn(MockTaggedItem, related_models.get_referring_models(MockPerson))
+                MockTaggedItem.objects.bulk_create([
+                    MockTaggedItem(tag='dog-person', content_type=self.person_ct, object_id=person.pk)
+                ])
+                self.assertIn(MockTaggedItem, related_models.get_referring_models(MockPerson))
+        finally:
+            default_generic_foreign_key_cache.clear(self.field)
+
+    def test_get_referring_models_prunes_generic_foreign_keys(self):
+        related_models = RelatedModels(generic_foreign_key_cache=GenericForeignKeyCache())
+        self.assertNotIn(MockTaggedItem, related_models.get_referring_models(MockPerson))
+        self.assertEqual(related_models.get_related_fields(MockPerson, MockTaggedItem), [])
+
+        TaggedItemFactory.create(tag='dog-person', content_object=PersonFactory.create())
+        self.assertEqual(
+            related_models.get_referring_models(MockPerson)[MockTaggedItem],
+            [self.field]
+        )
+        self.assertEqual(related_models.get_related_fields(MockPerson, MockTaggedItem), [self.field])
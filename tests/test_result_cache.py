@@ -0,0 +1,119 @@
+from django.core.cache import caches
+from django.test import TestCase
+from tests.factories import PersonFactory
+from tests.factories import PetFactory
+from tests.factories import PetSittingFactory
+from tests.factories import TaggedItemFactory
+from tests.test_app_1.models import MockPerson
+from tests.test_app_1.models import MockPet
+from tests.test_app_1.models import MockPetSitting
+from tests.test_app_2.models import MockTaggedItem
+
+from django_related_models.related_models import RelatedModels
+from django_related_models.result_cache import RelatedObjectsCache
+
+
+class RelatedObjectsCacheTests(TestCase):
+    def setUp(self):
+        super(RelatedObjectsCacheTests, self).setUp()
+        caches['default'].clear()
+        self.person = PersonFactory.create()
+        self.other_person = PersonFactory.create()
+        self.pets = PetFactory.create_batch(2, owner=self.person)
+        self.cache = RelatedObjectsCache()
+
+    def test_get_related_objects(self):
+        related_objects = self.cache.get_related_objects(self.person)
+        self.assertEqual(related_objects, {MockPet.owner.field: self.pets})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cache.get_related_objects(self.person), related_objects)
+        self.assertEqual(self.cache.get_stats(), {'hits': 1, 'misses': 1, 'invalidations': 0, 'hit_rate': 0.5})
+
+    def test_get_related_pks(self):
+        self.cache.get_related_pks(self.person)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.cache.get_related_pks(self.person),
+                {MockPet.owner.field: [pet.pk for pet in self.pets]}
+            )
+
+    def test_entries_are_keyed_by_filters(self):
+        self.cache.get_related_objects(self.person)
+        self.assertEqual(
+            self.cache.get_related_objects(self.person, pk=self.pets[0].pk),
+            {MockPet.owner.field: [self.pets[0]]}
+        )
+        self.assertEqual(self.cache.get_stats()['misses'], 2)
+
+    def test_save_invalidates(self):
+        self.cache.get_related_objects(self.person)
+        self.cache.get_related_objects(self.other_person)
+        new_pet = PetFactory.create(owner=self.person)
+        self.assertEqual(
+            self.cache.get_related_objects(self.person),
+            {MockPet.owner.field: self.pets + [new_pet]}
+        )
+        # Other instances are not invalidated
+        with self.assertNumQueries(0):
+            self.cache.get_related_objects(self.other_person)
+
+    def test_moving_a_row_invalidates_both_instances(self):
+        self.cache.get_related_objects(self.person)
+        self.cache.get_related_objects(self.other_person)
+        pet = MockPet.objects.get(pk=self.pets[0].pk)
+        pet.owner = self.other_person
+        pet.save()
+        self.assertEqual(self.cache.get_related_objects(self.person), {MockPet.owner.field: self.pets[1:]})
+        self.assertEqual(self.cache.get_related_objects(self.other_person), {MockPet.owner.field: [pet]})
+
+    def test_watch(self):
+        self.assertEqual(self.cache.watch(MockPerson), ['id'])
+        pet = MockPet.objects.get(pk=self.pets[0].pk)
+        self.cache.get_related_objects(self.person)
+        pet.owner = self.other_person
+        pet.save()
+        self.assertEqual(self.cache.get_related_objects(self.person), {MockPet.owner.field: self.pets[1:]})
+
+    def test_invalidates_without_lookups(self):
+        # Processes which only write the rows invalidate the entries too.
+        PetFactory.create(owner=self.person)
+        self.assertGreater(self.cache.get_stats()['invalidations'], 0)
+
+    def test_models(self):
+        cache = RelatedObjectsCache(models=[MockPerson])
+        cache.get_related_objects(self.person)
+        PetFactory.create(owner=self.person)
+        self.assertEqual(cache.get_related_objects(self.person), {MockPet.owner.field: list(self.person.pets.all())})
+        with self.assertRaises(ValueError):
+            cache.get_related_objects(self.pets[0])
+
+    def test_related_models_option(self):
+        with self.assertRaises(ValueError):
+            self.cache.get_related_objects(self.person, related_models=RelatedModels())
+
+    def test_delete_invalidates(self):
+        self.cache.get_related_objects(self.person)
+        self.pets[0].delete()
+        self.assertEqual(self.cache.get_related_objects(self.person), {MockPet.owner.field: self.pets[1:]})
+        self.assertGreater(self.cache.get_stats()['invalidations'], 0)
+
+    def test_nullable_foreign_keys(self):
+        sitting = PetSittingFactory.create(owner=self.person)
+        self.cache.get_related_objects(self.person)
+        sitting = MockPetSitting.objects.get(pk=sitting.pk)
+        sitting.owner = None
+        sitting.save()
+        self.assertEqual(self.cache.get_related_objects(self.person), {MockPet.owner.field: self.pets})
+
+    def test_generic_foreign_keys(self):
+        self.cache.get_related_objects(self.person)
+        tagged_item = TaggedItemFactory.create(tag='dog-person', content_object=self.person)
+        self.assertEqual(
+            self.cache.get_related_objects(self.person)[MockTaggedItem.content_object],
+            [tagged_item]
+        )
+
+    def test_reset_stats(self):
+        self.cache.get_related_objects(self.person)
+        self.cache.reset_stats()
+        self.assertEqual(self.cache.get_stats(), {'hits': 0, 'misses': 0, 'invalidations': 0, 'hit_rate': 0.0})
@@ -0,0 +1,73 @@
+from django.db import DatabaseError
+from django.db import connection
+from django.test import TestCase
+from tests.factories import PersonFactory
+from tests.factories import PetFactory
+from tests.factories import TaggedItemFactory
+from tests.test_app_1.models import MockPet
+
+from django_related_models import timeouts
+from django_related_models.related_models import get_related_objects
+from django_related_models.related_models import get_related_objects_with_timeout
+from django_related_models.timeouts import statement_timeout
+
+
+class StatementTimeoutTests(TestCase):
+    def test_statement_timeout(self):
+        query = (
+            'WITH RECURSIVE numbers(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM numbers WHERE n < {:d}) '
+            'SELECT COUNT(*) FROM numbers'
+        )
+        with self.assertRaises(DatabaseError):
+            with statement_timeout('default', 0.05):
+                with connection.cursor() as cursor:
+                    cursor.execute(query.format(100000000))
+
+        # The timeout only applies inside of the block, even when it is
+        # nested in a transaction.
+        with statement_timeout('default', 0.01):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                self.assertEqual(cursor.fetchone(), (1,))
+        with connection.cursor() as cursor:
+            cursor.execute(query.format(200000))
+            self.assertEqual(cursor.fetchone(), (200000,))
+
+
+class GetRelatedObjectsWithTimeoutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super(GetRelatedObjectsWithTimeoutTests, cls).setUpTestData()
+        cls.person = PersonFactory.create()
+        PetFactory.create_batch(2, owner=cls.person)
+        TaggedItemFactory.create(content_object=cls.person)
+
+    def test_get_related_objects_with_timeout(self):
+        related_objects = get_related_objects_with_timeout(self.person, 10)
+        self.assertEqual(related_objects, get_related_objects(self.person))
+        self.assertTrue(related_objects.complete)
+        self.assertEqual(related_objects.timed_out, [])
+        self.assertEqual(related_objects.skipped, [])
+
+    def test_get_related_objects_with_timeout_skipped(self):
+        related_objects = get_related_objects_with_timeout(self.person, 0)
+        self.assertEqual(related_objects, {})
+        self.assertFalse(related_objects.complete)
+        self.assertIn(MockPet._meta.get_field('owner'), related_objects.skipped)
+        self.assertEqual(related_objects.timed_out, [])
+
+    def test_get_related_objects_with_timeout_timed_out(self):
+        interval = timeouts.SQLITE_PROGRESS_INTERVAL
+        timeouts.SQLITE_PROGRESS_INTERVAL = 1
+        try:
+            related_objects = get_related_objects_with_timeout(self.person, 10, field_timeout=1e-9)
+        finally:
+            timeouts.SQLITE_PROGRESS_INTERVAL = interval
+
+        self.assertEqual(related_objects, {})
+        self.assertFalse(related_objects.complete)
+        self.assertIn(MockPet._meta.get_field('owner'), related_objects.timed_out)
+        self.assertEqual(related_objects.skipped, [])
+
+        # The connection is usable again afterwards.
+        self.assertEqual(get_related_objects_with_timeout(self.person, 10), get_related_objects(self.person))